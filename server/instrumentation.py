@@ -0,0 +1,225 @@
+"""
+Instrumentation partagée des APIs Python (Sudoku, Mushroom, OCR)
+Histogrammes de latence par endpoint, requêtes en cours, temps par étape coûteuse,
+exposés sur /metrics au format texte Prometheus
+
+Sans dépendance externe : un verrou + une recherche dichotomique par mesure,
+assez léger pour rester actif en production. Les métriques sont par processus.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+# Bornes (secondes) adaptées à des requêtes de la milliseconde à la dizaine de secondes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            items = list(self._values.items())
+        for values, total in items:
+            yield f'{self.name}{_format_labels(self.labels, values)} {_format_value(total)}'
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} gauge'
+        with self._lock:
+            items = list(self._values.items())
+        for values, value in items:
+            yield f'{self.name}{_format_labels(self.labels, values)} {_format_value(value)}'
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Par jeu de labels : [compte par intervalle (non cumulé)..., +Inf], somme, total
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            items = [(values, (counts[:], total, n)) for values, (counts, total, n) in self._series.items()]
+        for values, (counts, total, n) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, values)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labels, values)} {n}'
+
+
+class Metrics:
+    """Registre de métriques d'un service (préfixe = nom du service)"""
+
+    def __init__(self, service: str):
+        self.service = service
+        self._collectors = []
+        self.request_latency = self.histogram(
+            'request_duration_seconds', 'Latence des requêtes HTTP', ('endpoint', 'method', 'status'))
+        self.in_flight = self.gauge(
+            'requests_in_flight', 'Requêtes HTTP en cours de traitement', ('endpoint',))
+        self.stage_latency = self.histogram(
+            'stage_duration_seconds', 'Temps passé dans les étapes coûteuses', ('stage',))
+
+    def _register(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(f'{self.service}_{name}', help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(f'{self.service}_{name}', help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(f'{self.service}_{name}', help_text, labels, buckets))
+
+    @contextmanager
+    def stage(self, name: str):
+        """Chronomètre une étape : with metrics.stage('solve'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_latency.observe(time.perf_counter() - start, name)
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        self.request_latency.observe(seconds, endpoint, method, str(status))
+
+    def render(self) -> str:
+        lines = []
+        for collector in self._collectors:
+            lines.extend(collector.render())
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_flask(app, metrics: Metrics, path: str = '/metrics'):
+    """Mesure chaque requête Flask et ajoute l'endpoint /metrics"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.in_flight.inc(g._metrics_endpoint)
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        endpoint = g.pop('_metrics_endpoint')
+        status = g.pop('_metrics_status', 500)
+        metrics.in_flight.dec(endpoint)
+        metrics.observe_request(endpoint, request.method, status, time.perf_counter() - start)
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_url_rule(path, 'metrics', metrics_endpoint, methods=['GET'])
+
+
+def instrument_fastapi(app, metrics: Metrics, path: str = '/metrics'):
+    """Mesure chaque requête FastAPI (middleware HTTP) et ajoute l'endpoint /metrics"""
+    from fastapi.responses import Response
+
+    @app.middleware('http')
+    async def _metrics_middleware(request, call_next):
+        start = time.perf_counter()
+        # Gabarit de route (pas le chemin brut) : une série par endpoint, pas par URL scannée
+        endpoint = 'unmatched'
+        for route in app.router.routes:
+            match, _ = route.matches(request.scope)
+            if match.name == 'FULL':
+                endpoint = getattr(route, 'path', endpoint)
+                break
+        metrics.in_flight.inc(endpoint)
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.in_flight.dec(endpoint)
+            metrics.observe_request(endpoint, request.method, status, time.perf_counter() - start)
+
+    @app.get(path, include_in_schema=False)
+    def metrics_endpoint():
+        return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,11 +1,36 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import subprocess
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import hashlib
+import io
+import json
 import os
-import shutil
+import sys
+import tempfile
+import zipfile
 
-app = FastAPI(title="OCR Sudoku API")
+# Instrumentation partagée entre les APIs Python (server/instrumentation.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import Metrics, instrument_fastapi
+from result_cache import ResultCache
+from solver_output import read_grid
+from solver_pool import PoolUnavailable, SolverPool
+from workspaces import DEBUG_IMAGES, OUTPUT_IMAGE, WorkspaceStore
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await pool.start()
+    yield
+    await pool.stop()
+
+
+app = FastAPI(title="OCR Sudoku API", lifespan=lifespan)
+metrics = Metrics('ocr')
+instrument_fastapi(app, metrics)
 
 # Allow CORS
 app.add_middleware(
@@ -16,69 +41,210 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = "data"
-OUTPUT_IMAGE = "output_api.png"
-DEBUG_IMAGES = [
-    "debug_1_gray.png",
-    "debug_2_blurred.png",
-    "debug_3_binary.png",
-    "debug_4_grid_detected.png",
-    "debug_5_rectified.png",
-    "debug_6_cells.png"
-]
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOLVER_BINARY = os.path.join(SCRIPT_DIR, "build", "sudoku_solver")
+SOLVER_TIMEOUT = 30
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Legacy name of the output image in /debug-images/{image_name}
+LEGACY_OUTPUT_IMAGE = "output_api.png"
+
+# One workspace per request (upload, output, debug images), kept OCR_RESULT_TTL seconds
+workspaces = WorkspaceStore(
+    os.environ.get("OCR_WORK_DIR", os.path.join(tempfile.gettempdir(), "ocr_sudoku")),
+    os.path.join(SCRIPT_DIR, "models"),
+    ttl=float(os.environ.get("OCR_RESULT_TTL", 600)),
+    max_results=int(os.environ.get("OCR_MAX_RESULTS", 200)),
+)
+
+# Results of successful solves by sha256 of the upload, on disk, LRU within OCR_CACHE_MAX_BYTES (0 disables)
+cache = ResultCache(
+    os.environ.get("OCR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ocr_sudoku_cache")),
+    int(os.environ.get("OCR_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+    debug_images=os.environ.get("OCR_CACHE_DEBUG_IMAGES", "1") == "1",
+)
+
+MAX_CONCURRENT = int(os.environ.get("OCR_MAX_CONCURRENT", os.cpu_count() or 2))
+# Resident solver workers: bounded queue (429 beyond), health probe, recovery after a crash
+pool = SolverPool(
+    SOLVER_BINARY,
+    os.path.join(SCRIPT_DIR, "models", "cnn_weights.bin"),
+    size=MAX_CONCURRENT,
+    max_queue=int(os.environ.get("OCR_MAX_QUEUE", 2 * MAX_CONCURRENT)),
+    timeout=SOLVER_TIMEOUT,
+)
+RETRY_AFTER = 2
+
+# Images returned by /solve: none (grid only, nothing written to disk), urls, inline (base64) or zip
+IMAGE_MODES = ("none", "urls", "inline", "zip")
+
+# Most recent successful result with images, for the legacy /debug-images endpoints
+latest_result_id = None
+
+
+def image_urls(result_id: str) -> dict:
+    images = workspaces.images(result_id)
+    return {
+        "output_image": f"/results/{result_id}/images/{OUTPUT_IMAGE}" if OUTPUT_IMAGE in images else None,
+        "debug_images": [f"/results/{result_id}/images/{name}" for name in images if name in DEBUG_IMAGES]
+    }
+
+
+def read_images(result_id: str) -> dict:
+    images = {}
+    for name in workspaces.images(result_id):
+        with open(workspaces.image_path(result_id, name), "rb") as f:
+            images[name] = f.read()
+    return images
+
+
+def zip_bundle(body: dict, images: dict) -> bytes:
+    """result.json + images in one archive (PNGs are already compressed: stored as is)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("result.json", json.dumps(body))
+        for name, data in images.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+async def solve_response(body: dict, images: str):
+    if images == "inline":
+        data = await asyncio.to_thread(read_images, body["id"])
+        return {**body, "images": {name: base64.b64encode(png).decode("ascii") for name, png in data.items()}}
+    if images == "zip":
+        data = await asyncio.to_thread(read_images, body["id"])
+        return Response(
+            await asyncio.to_thread(zip_bundle, body, data),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="sudoku_{body["id"]}.zip"',
+                     "X-Result-Id": body["id"]}
+        )
+    return body
+
+
+async def save_upload(file: UploadFile, path: str) -> str:
+    """Stream the upload to disk chunk by chunk, file writes off the event loop -> sha256 hex digest"""
+    digest = hashlib.sha256()
+    with open(path, "wb") as buffer:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            await asyncio.to_thread(buffer.write, chunk)
+    return digest.hexdigest()
+
 
 @app.post("/solve")
-async def solve_sudoku(file: UploadFile = File(...)):
-    # Ensure data directory exists
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
-    file_location = os.path.join(UPLOAD_DIR, "api_upload.png")
-    
+async def solve_sudoku(file: UploadFile = File(...), images: str = Query("none")):
+    global latest_result_id
+    if images not in IMAGE_MODES:
+        raise HTTPException(status_code=400, detail=f"images must be one of {', '.join(IMAGE_MODES)}")
+    await asyncio.to_thread(workspaces.sweep)
+
+    result_id, workdir = workspaces.create(images=images != "none")
+    file_location = os.path.join(workdir, "upload.png")
+
     # Save uploaded file
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # Run C program
-    # Assuming running from root: ./build/sudoku_solver
-    # Usage: ./build/sudoku_solver <input_image> <output_image>
-    command = ["./build/sudoku_solver", file_location, OUTPUT_IMAGE]
-    
+    with metrics.stage('upload'):
+        upload_hash = await save_upload(file, file_location)
+
+    # Same bytes already solved: served even when the solver queue is full or down
+    with metrics.stage('cache'):
+        cached = await asyncio.to_thread(cache.get, upload_hash, workdir, images != "none")
+    if cached is not None:
+        if cached.get("grid") is None:
+            cached.update(read_grid(cached["stdout"]))
+        body = {"id": result_id, **cached, **image_urls(result_id), "cached": True}
+        await asyncio.to_thread(workspaces.save_result, result_id, body)
+        if images != "none":
+            latest_result_id = result_id
+        return await solve_response(body, images)
+
+    # Run C program inside the workspace: debug images land next to the upload
+    # Usage: sudoku_solver <input_image> <output_image>
+    command = [SOLVER_BINARY, file_location, OUTPUT_IMAGE]
+
     try:
         # Run with timeout to prevent infinite loops if they still exist
-        result = subprocess.run(command, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode != 0:
-             # For demo purposes, if binary is missing, we might want to mock it or just fail.
-             # But let's stick to the code provided.
-             raise HTTPException(status_code=500, detail=f"Solver failed: {result.stderr}")
-             
-        return {
-            "message": "Sudoku processed successfully",
-            "stdout": result.stdout,
-            "stderr": result.stderr
-        }
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=504, detail="Solver timed out")
+        with metrics.stage('subprocess'):
+            returncode, stdout, stderr = await pool.solve(command, workdir)
+    except asyncio.QueueFull:
+        workspaces.discard(result_id)
+        raise HTTPException(status_code=429, detail="Too many OCR requests in progress, retry later",
+                            headers={"Retry-After": str(RETRY_AFTER)})
+    except PoolUnavailable as e:
+        workspaces.discard(result_id)
+        raise HTTPException(status_code=503, detail=f"Solver unavailable: {e}",
+                            headers={"Retry-After": str(RETRY_AFTER)})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Solver timed out", headers={"X-Result-Id": result_id})
     except FileNotFoundError:
-        raise HTTPException(status_code=500, detail="Solver binary not found at ./build/sudoku_solver")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error running solver: {str(e)}")
+        workspaces.discard(result_id)
+        raise HTTPException(status_code=500, detail=f"Solver binary not found at {SOLVER_BINARY}")
+
+    body = {
+        "id": result_id,
+        "message": "Sudoku processed successfully" if returncode == 0 else "Solver failed",
+        "stdout": stdout,
+        "stderr": stderr,
+        # Recognized grid parsed from stdout, solution from the bitmask engine
+        **await asyncio.to_thread(read_grid, stdout),
+        **image_urls(result_id),
+        "cached": False
+    }
+    await asyncio.to_thread(workspaces.save_result, result_id, body)
+
+    if returncode != 0:
+        # Debug images of a failed solve (if requested) stay available under /results/{id}
+        raise HTTPException(status_code=500, detail=f"Solver failed: {stderr}",
+                            headers={"X-Result-Id": result_id})
+
+    await asyncio.to_thread(cache.put, upload_hash, workdir, body)
+    if images != "none":
+        latest_result_id = result_id
+    return await solve_response(body, images)
+
+
+@app.get("/results/{result_id}")
+def get_result(result_id: str):
+    result = workspaces.load_result(result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return result
+
+
+@app.get("/results/{result_id}/images/{image_name}")
+def get_result_image(result_id: str, image_name: str):
+    path = workspaces.image_path(result_id, image_name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found or not allowed")
+    return FileResponse(path)
+
+
+@app.get("/health")
+def health():
+    return {"status": "healthy" if pool.healthy else "degraded", "solver_binary": os.path.exists(SOLVER_BINARY),
+            "solver": pool.stats(), "cache": cache.stats()}
+
 
 @app.get("/debug-images")
 def list_debug_images():
-    # Check which exist
-    existing = [img for img in DEBUG_IMAGES if os.path.exists(img)]
-    return {"images": existing}
+    # Legacy: debug images of the most recent successful solve
+    with metrics.stage('io'):
+        existing = workspaces.images(latest_result_id) if latest_result_id else []
+    return {"images": [img for img in existing if img in DEBUG_IMAGES]}
+
 
 @app.get("/debug-images/{image_name}")
 def get_debug_image(image_name: str):
-    # Allow getting debug images and the output image
-    allowed = DEBUG_IMAGES + [OUTPUT_IMAGE]
-    
-    if image_name not in allowed:
+    # Legacy: allow getting debug images and the output image of the most recent solve
+    if image_name == LEGACY_OUTPUT_IMAGE:
+        image_name = OUTPUT_IMAGE
+
+    path = workspaces.image_path(latest_result_id, image_name) if latest_result_id else None
+    if path is None:
         raise HTTPException(status_code=404, detail="Image not found or not allowed")
-    
-    if not os.path.exists(image_name):
-        raise HTTPException(status_code=404, detail="Image file does not exist")
-        
-    return FileResponse(image_name)
+
+    return FileResponse(path)
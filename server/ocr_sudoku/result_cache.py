@@ -0,0 +1,188 @@
+"""
+Content-addressed cache of OCR results.
+
+Entries are keyed by the sha256 of the uploaded bytes: resubmitting the same
+photo skips the solver. Each entry is a directory <root>/<sha256>/ holding the
+result (result.json: message, stdout, stderr, grid, solution) and, when the
+request produced them, the output image and (unless disabled) the debug
+images. The cache is bounded by total bytes with LRU eviction; the directory
+mtime is the LRU clock, so the index is rebuilt from a scan of the directory
+on startup and survives restarts. Uvicorn workers share the directory: each
+one indexes entries written by the others on a miss, and recounts the
+directory after every write, so the byte bound holds for all workers together.
+
+Files are hard-linked between workspaces and the cache (copied across
+filesystems): a hit costs a few links, and eviction never breaks a workspace.
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+from workspaces import DEBUG_IMAGES, OUTPUT_IMAGE
+
+ENTRY_FILE = "result.json"
+CACHED_FIELDS = ("message", "stdout", "stderr", "grid", "solution")
+
+# Entries being written by another uvicorn worker are younger than this
+STALE_TMP_AGE = 60
+
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _link(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _entry_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+class ResultCache:
+    def __init__(self, root: str, max_bytes: int, debug_images: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.debug_images = debug_images
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # key -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _images(self) -> List[str]:
+        return [OUTPUT_IMAGE] + (DEBUG_IMAGES if self.debug_images else [])
+
+    def _scan(self):
+        """Rebuild the index from disk, oldest mtime first; drop unfinished entries"""
+        self._entries.clear()
+        self.total_bytes = 0
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if _KEY.match(name):
+                    entries.append((os.path.getmtime(path), name, _entry_size(path)))
+                elif ".tmp-" in name and now - os.path.getmtime(path) > STALE_TMP_AGE:
+                    # Left behind by a crash during put()
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                continue
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _has_images(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self.root, key, OUTPUT_IMAGE))
+
+    def _adopt(self, key: str) -> bool:
+        """Index an entry written by another uvicorn worker; False if there is none"""
+        path = os.path.join(self.root, key)
+        try:
+            # Entries appear with a single rename: result.json is there if the directory is
+            size = _entry_size(path) if os.path.isfile(os.path.join(path, ENTRY_FILE)) else None
+        except FileNotFoundError:
+            size = None
+        if size is None:
+            return False
+        self._entries[key] = size
+        self.total_bytes += size
+        return True
+
+    def get(self, key: str, workdir: str, images: bool = True) -> Optional[dict]:
+        """Cached result for key, with its images linked into workdir if images, or None
+
+        An entry stored without images does not answer a request that wants them.
+        """
+        if not self.enabled:
+            return None
+        path = os.path.join(self.root, key)
+        with self._lock:
+            found = key in self._entries or self._adopt(key)
+            if not found or (images and not self._has_images(key)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        try:
+            with open(os.path.join(path, ENTRY_FILE), "r", encoding="utf-8") as f:
+                result = json.load(f)
+            for name in os.listdir(path) if images else []:
+                if name != ENTRY_FILE:
+                    _link(os.path.join(path, name), os.path.join(workdir, name))
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted in the meantime (by another thread or another uvicorn worker)
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self.total_bytes -= size
+            return None
+        return result
+
+    def put(self, key: str, workdir: str, result: dict):
+        """Store a successful result and the images the solver wrote in workdir
+
+        An entry without images is replaced by one with images, never the reverse.
+        """
+        if not self.enabled:
+            return
+        images = [name for name in self._images() if os.path.isfile(os.path.join(workdir, name))]
+        with self._lock:
+            if key in self._entries or self._adopt(key):
+                if not images or self._has_images(key):
+                    return
+                self.total_bytes -= self._entries.pop(key)
+                shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+
+        tmp_path = os.path.join(self.root, f"{key}.tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_path)
+        for name in images:
+            _link(os.path.join(workdir, name), os.path.join(tmp_path, name))
+        with open(os.path.join(tmp_path, ENTRY_FILE), "w", encoding="utf-8") as f:
+            json.dump({field: result.get(field) for field in CACHED_FIELDS}, f)
+
+        with self._lock:
+            try:
+                os.rename(tmp_path, os.path.join(self.root, key))
+            except OSError:
+                # Same upload cached concurrently (by this or another uvicorn worker): keep that entry
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            # Other workers write to the same directory: recount it before evicting
+            self._scan()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
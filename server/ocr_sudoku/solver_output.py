@@ -0,0 +1,55 @@
+"""
+Recognized and solved grid, read from the solver output.
+
+The binary prints the grid it recognized (after correction) as an ASCII board
+under "Detected Grid (Corrected):", but not its solution: the solution is
+recomputed with the bitmask engine of the Sudoku service
+(server/sudoku/sudoku_engine.py), which takes a few milliseconds.
+"""
+
+import os
+import sys
+import time
+from typing import List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sudoku"))
+from sudoku_engine import BitmaskSolver, SolverTimeout
+
+GRID_HEADER = "Detected Grid (Corrected):"
+SOLVE_TIMEOUT = 1.0
+
+
+def parse_grid(stdout: str) -> Optional[List[List[int]]]:
+    """Last board printed under GRID_HEADER -> 9x9 grid (0 = empty), None if absent"""
+    lines = stdout.splitlines()
+    starts = [i for i, line in enumerate(lines) if line.strip() == GRID_HEADER]
+    if not starts:
+        return None
+
+    grid = []
+    for line in lines[starts[-1] + 1:]:
+        line = line.strip()
+        if line.startswith("+"):
+            continue
+        if not line.startswith("|") or len(grid) == 9:
+            break
+        cells = [c for c in line if c.isdigit() or c == "."]
+        if len(cells) != 9:
+            return None
+        grid.append([0 if c == "." else int(c) for c in cells])
+    return grid if len(grid) == 9 else None
+
+
+def solve_grid(grid: List[List[int]]) -> Optional[List[List[int]]]:
+    solution = [row[:] for row in grid]
+    solver = BitmaskSolver(deadline=time.monotonic() + SOLVE_TIMEOUT)
+    try:
+        return solution if solver.solve(solution) else None
+    except SolverTimeout:
+        return None
+
+
+def read_grid(stdout: str) -> dict:
+    """{"grid": recognized grid, "solution": solved grid}, None where unavailable"""
+    grid = parse_grid(stdout)
+    return {"grid": grid, "solution": solve_grid(grid) if grid else None}
@@ -0,0 +1,165 @@
+"""
+Resident pool of OCR solver workers.
+
+A fixed number of long-lived asyncio workers take jobs from a bounded queue and
+run the C binary for each one. The pool owns dispatch, backpressure (QueueFull
+when the queue is full), health checks and recovery after a solver crash.
+
+The binary is a PIE executable with a one-shot CLI (image in, image out): it
+cannot be loaded with ctypes and has no daemon mode, so each job is still one
+exec. Process start-up and loading models/cnn_weights.bin (138 KB) cost a few
+milliseconds against 0.2-1.5 s for the pipeline itself.
+"""
+
+import asyncio
+import os
+from typing import Optional, Tuple
+
+
+class PoolUnavailable(Exception):
+    pass
+
+
+async def run_solver(command: list, cwd: str, timeout: float) -> Tuple[int, str, str]:
+    """Run the binary without blocking the event loop -> (returncode, stdout, stderr)
+
+    The process is killed on timeout (asyncio.TimeoutError) and when the caller
+    is cancelled (client gone), so no solver outlives its request.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *command, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+class _Job:
+    __slots__ = ("command", "cwd", "future", "task")
+
+    def __init__(self, command: list, cwd: str, future: asyncio.Future):
+        self.command = command
+        self.cwd = cwd
+        self.future = future
+        self.task: Optional[asyncio.Task] = None
+
+
+class SolverPool:
+    def __init__(self, binary: str, weights: str, size: int, max_queue: int,
+                 timeout: float = 30, retry_interval: float = 5):
+        self.binary = binary
+        self.weights = weights
+        self.size = size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self.running = 0
+        self.completed = 0
+        self.crashes = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._recovery: Optional[asyncio.Task] = None
+
+    async def check(self) -> bool:
+        """Health probe: the binary starts (prints its usage) and the CNN weights are readable"""
+        if not os.access(self.weights, os.R_OK):
+            return self._set_health(False, f"weights not readable: {self.weights}")
+        try:
+            returncode, stdout, stderr = await run_solver([self.binary], os.path.dirname(self.binary), 5)
+        except FileNotFoundError:
+            return self._set_health(False, f"solver binary not found at {self.binary}")
+        except (OSError, asyncio.TimeoutError) as e:
+            return self._set_health(False, f"solver probe failed: {e!r}")
+        if returncode < 0 or "Usage" not in stdout + stderr:
+            return self._set_health(False, f"solver probe failed (exit {returncode})")
+        return self._set_health(True, None)
+
+    def _set_health(self, healthy: bool, error: Optional[str]) -> bool:
+        self.healthy = healthy
+        self.last_error = error
+        return healthy
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker(), name=f"ocr-solver-{i}") for i in range(self.size)]
+        if not await self.check():
+            self._start_recovery()
+
+    async def stop(self):
+        for task in self._workers + ([self._recovery] if self._recovery else []):
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Jobs still queued will never run: release their callers
+        while not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+
+    async def solve(self, command: list, cwd: str) -> Tuple[int, str, str]:
+        """Queue a job and wait for it (asyncio.QueueFull when the queue is full)"""
+        if not self.healthy:
+            raise PoolUnavailable(self.last_error or "solver pool is not ready")
+        job = _Job(command, cwd, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(job)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # Client gone: drop the job, or kill its solver if it already started
+            if job.task is not None:
+                job.task.cancel()
+            raise
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.future.done():
+                continue
+            self.running += 1
+            job.task = asyncio.create_task(run_solver(job.command, job.cwd, self.timeout))
+            try:
+                returncode, stdout, stderr = await job.task
+            except asyncio.CancelledError:
+                job.future.cancel()
+                if asyncio.current_task().cancelling():
+                    raise  # the worker itself is being stopped (its solver is killed with it)
+                continue  # only the job was cancelled: client gone
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+                continue
+            finally:
+                self.running -= 1
+
+            self.completed += 1
+            if not job.future.done():
+                job.future.set_result((returncode, stdout, stderr))
+            if returncode < 0:
+                # Killed by a signal (segfault, OOM...): make sure the solver still works
+                self.crashes += 1
+                if not await self.check():
+                    self._start_recovery()
+
+    def _start_recovery(self):
+        if self._recovery is None or self._recovery.done():
+            self._recovery = asyncio.create_task(self._recover())
+
+    async def _recover(self):
+        while not await self.check():
+            await asyncio.sleep(self.retry_interval)
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "error": self.last_error,
+            "workers": self.size,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "crashes": self.crashes
+        }
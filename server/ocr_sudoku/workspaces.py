@@ -0,0 +1,121 @@
+"""
+Per-request workspaces for the OCR solver.
+
+The C binary reads models/cnn_weights.bin and writes its debug PNGs relative to
+its working directory, so every request runs in its own directory
+(<root>/<result id>/) holding the upload, the output image, the debug images and
+a result.json. Old workspaces are swept by age and count.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+OUTPUT_IMAGE = "output.png"
+DEBUG_IMAGES = [
+    "debug_1_gray.png",
+    "debug_2_blurred.png",
+    "debug_3_binary.png",
+    "debug_4_grid_detected.png",
+    "debug_5_rectified.png",
+    "debug_6_cells.png"
+]
+RESULT_FILE = "result.json"
+
+_RESULT_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class WorkspaceStore:
+    def __init__(self, root: str, models_dir: str, ttl: float = 600, max_results: int = 200):
+        self.root = root
+        self.models_dir = os.path.abspath(models_dir)
+        self.ttl = ttl
+        self.max_results = max_results
+        os.makedirs(root, exist_ok=True)
+
+    def create(self, images: bool = True) -> Tuple[str, str]:
+        """New empty workspace -> (result id, path)
+
+        With images=False the output and debug image names point to /dev/null: the
+        binary still encodes them (it has no switch for that) but nothing is written.
+        """
+        result_id = uuid.uuid4().hex
+        path = os.path.join(self.root, result_id)
+        os.makedirs(path)
+        # The binary loads models/cnn_weights.bin relative to its cwd
+        os.symlink(self.models_dir, os.path.join(path, "models"))
+        if not images:
+            for name in [OUTPUT_IMAGE] + DEBUG_IMAGES:
+                os.symlink(os.devnull, os.path.join(path, name))
+        return result_id, path
+
+    def path(self, result_id: str) -> Optional[str]:
+        # Ids come from URLs: only accept our own hex ids (no path traversal)
+        if not _RESULT_ID.match(result_id):
+            return None
+        path = os.path.join(self.root, result_id)
+        return path if os.path.isdir(path) else None
+
+    def image_path(self, result_id: str, name: str) -> Optional[str]:
+        path = self.path(result_id)
+        if path is None or name not in DEBUG_IMAGES + [OUTPUT_IMAGE]:
+            return None
+        image = os.path.join(path, name)
+        return image if os.path.isfile(image) else None
+
+    def images(self, result_id: str) -> List[str]:
+        """Images produced by the solver for this request (output first)"""
+        path = self.path(result_id)
+        if path is None:
+            return []
+        # isfile: skips names linked to /dev/null
+        return [name for name in [OUTPUT_IMAGE] + DEBUG_IMAGES if os.path.isfile(os.path.join(path, name))]
+
+    def save_result(self, result_id: str, result: dict):
+        path = self.path(result_id)
+        tmp_path = os.path.join(path, RESULT_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, os.path.join(path, RESULT_FILE))
+
+    def load_result(self, result_id: str) -> Optional[dict]:
+        path = self.path(result_id)
+        if path is None:
+            return None
+        try:
+            with open(os.path.join(path, RESULT_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def discard(self, result_id: str):
+        path = self.path(result_id)
+        if path is not None:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Remove workspaces older than ttl, then the oldest beyond max_results"""
+        now = time.time() if now is None else now
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not _RESULT_ID.match(name):
+                continue
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+
+        entries.sort()
+        expired = [path for mtime, path in entries if now - mtime > self.ttl]
+        kept = len(entries) - len(expired)
+        if kept > self.max_results:
+            expired += [path for _, path in entries[len(expired):len(expired) + kept - self.max_results]]
+
+        for path in expired:
+            shutil.rmtree(path, ignore_errors=True)
+        return len(expired)
@@ -0,0 +1,89 @@
+"""
+Micro-batching des requêtes d'inférence
+Regroupe les appels concurrents pendant quelques millisecondes (ou jusqu'à N éléments),
+exécute une seule passe sur le lot puis rend à chaque appelant son résultat
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    """File d'attente + thread de traitement par lots
+
+    run_batch reçoit la liste des éléments du lot et doit retourner
+    une liste de résultats de même longueur, dans le même ordre.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 3.0, name: str = 'batcher'):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.name = name
+        # Statistiques : nombre de lots et d'éléments traités
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit_async(self, item) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit(self, item, timeout: Optional[float] = None):
+        """Soumet un élément et attend son résultat (appel bloquant côté requête)"""
+        return self.submit_async(item).result(timeout)
+
+    def _collect(self) -> list:
+        # Le premier élément est attendu sans limite, les suivants jusqu'à l'échéance
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.run_batch(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
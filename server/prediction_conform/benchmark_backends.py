@@ -0,0 +1,166 @@
+"""
+Parité et latence des backends d'inférence de MushroomCNN
+Compare chaque backend au modèle eager float32 sur un jeu d'images de validation :
+accord top-1, recouvrement top-5, écart max de probabilité, accord des ensembles
+conformes ; puis latence p50/p99 par taille de lot. Rapport JSON.
+
+Usage (depuis server/prediction_conform) :
+    python benchmark_backends.py --images dossier_validation/
+    python benchmark_backends.py --backends eager,torchscript,int8-static -o backends.json
+    python benchmark_backends.py --min-agreement 0.99     # échoue si un backend dérive
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from inference_backends import BACKENDS, NEEDS_CALIBRATION, build_backend, load_images, onnxruntime
+from mushroom_model import load_model
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(SCRIPT_DIR, 'best_mushroom_model.pth')
+CALIBRATION_SCORES_PATH = os.path.join(SCRIPT_DIR, 'calibration_scores.npy')
+SAMPLES_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'public', 'samples')
+
+
+def conformal_threshold(alpha: float) -> float:
+    """Seuil conforme (même formule que ConformalPredictor._quantile)"""
+    if not os.path.exists(CALIBRATION_SCORES_PATH):
+        return 0.5  # sans calibration : ensembles des classes à plus de 50 %
+    scores = np.load(CALIBRATION_SCORES_PATH)
+    n = len(scores)
+    return float(np.quantile(scores, min(np.ceil((n + 1) * (1 - alpha)) / n, 1.0)))
+
+
+def probabilities(model, inputs: torch.Tensor, batch_size: int = 32) -> torch.Tensor:
+    with torch.no_grad():
+        return torch.cat([
+            F.softmax(model(inputs[start:start + batch_size]), dim=1)
+            for start in range(0, len(inputs), batch_size)
+        ])
+
+
+def parity(reference: torch.Tensor, candidate: torch.Tensor, threshold: float) -> dict:
+    top5_ref = reference.topk(5, dim=1).indices
+    top5_new = candidate.topk(5, dim=1).indices
+    overlap = [
+        len(set(a.tolist()) & set(b.tolist())) / 5
+        for a, b in zip(top5_ref, top5_new)
+    ]
+    sets_ref = (1 - reference) <= threshold
+    sets_new = (1 - candidate) <= threshold
+    return {
+        'top1_agreement': round((reference.argmax(1) == candidate.argmax(1)).float().mean().item(), 4),
+        'top5_overlap': round(float(np.mean(overlap)), 4),
+        'max_abs_prob_diff': float((reference - candidate).abs().max()),
+        'set_agreement': round((sets_ref == sets_new).all(dim=1).float().mean().item(), 4)
+    }
+
+
+def latency(model, batch_size: int, repeat: int) -> dict:
+    inputs = torch.randn(batch_size, 3, 128, 128)
+    timings = []
+    with torch.no_grad():
+        model(inputs)  # échauffement (allocations, profilage TorchScript)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(inputs)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    return {
+        'p50_ms': round(p50 * 1000, 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(0.99 * len(timings)))] * 1000, 3),
+        'images_per_s': round(batch_size / p50, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parité et latence des backends MushroomCNN')
+    parser.add_argument('--images', default=SAMPLES_DIR, help='Dossier des images de validation')
+    parser.add_argument('--calibration-images',
+                        help='Images de calibration int8 (défaut : une image sur deux de --images, '
+                             'la parité étant alors mesurée sur les autres)')
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--batch-sizes', default='1,16')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--alpha', type=float, default=0.1, help='Niveau des ensembles conformes comparés')
+    parser.add_argument('--min-agreement', type=float, help='Accord top-1 minimal exigé (ex. 0.99)')
+    parser.add_argument('-o', '--output', help='Fichier JSON de sortie (défaut : stdout)')
+    args = parser.parse_args()
+
+    model, model_loaded = load_model(MODEL_PATH, torch.device('cpu'))
+    if not model_loaded:
+        print("⚠️  Model file not found, using random initialization", file=sys.stderr)
+
+    validation = load_images(args.images)
+    if not len(validation):
+        parser.error(f'no images in {args.images}')
+    if args.calibration_images:
+        calibration = load_images(args.calibration_images)
+    elif len(validation) >= 2:
+        # Calibrer et mesurer la parité sur les mêmes images rendrait l'accord optimiste :
+        # jeux disjoints, une image sur deux pour chacun
+        calibration, validation = validation[0::2], validation[1::2]
+    else:
+        print("⚠️  Single image: int8 calibration and parity use the same image, "
+              "pass --calibration-images for a meaningful check", file=sys.stderr)
+        calibration = validation
+
+    threshold = conformal_threshold(args.alpha)
+    reference = probabilities(model, validation)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    report = {
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'threads': torch.get_num_threads(),
+        'images': len(validation),
+        'calibration_images': len(calibration),
+        'model_loaded': model_loaded,
+        'backends': {}
+    }
+    for name in args.backends.split(','):
+        if name == 'onnx' and onnxruntime is None:
+            report['backends'][name] = {'skipped': 'onnxruntime not installed'}
+            continue
+        start = time.perf_counter()
+        backend = build_backend(name, model, calibration if name in NEEDS_CALIBRATION else None)
+        result = {'build_s': round(time.perf_counter() - start, 3)}
+        result.update(parity(reference, probabilities(backend, validation), threshold))
+        result['latency'] = {str(b): latency(backend, b, args.repeat) for b in batch_sizes}
+        report['backends'][name] = result
+
+    eager = report['backends'].get('eager', {}).get('latency', {})
+    for result in report['backends'].values():
+        for size, timing in result.get('latency', {}).items():
+            if size in eager:
+                timing['speedup'] = round(eager[size]['p50_ms'] / timing['p50_ms'], 2)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.min_agreement is not None:
+        drifted = [
+            name for name, result in report['backends'].items()
+            if 'top1_agreement' in result and result['top1_agreement'] < args.min_agreement
+        ]
+        for name in drifted:
+            print(f"PARITY {name}: top-1 agreement {report['backends'][name]['top1_agreement']}", file=sys.stderr)
+        if drifted:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -62,8 +62,8 @@ def generate_calibration_scores(n_samples=1000, output_file='calibration_scores.
         print(f"  Q{q:.2f}: {np.quantile(scores, q):.4f}")
     print("="*60 + "\n")
     
-    # Sauvegarder
-    np.save(output_file, scores)
+    # Sauvegarder triés : l'API les ouvre en mmap sans avoir à les retrier
+    np.save(output_file, np.sort(scores))
     print(f"✅ Scores sauvegardés dans: {output_file}")
     
     # Vérification
@@ -0,0 +1,148 @@
+"""
+Backends d'inférence CPU pour MushroomCNN
+Le modèle sert toujours en mode eval : BatchNorm est replié dans les convolutions
+et Dropout retiré, puis le graphe est figé (TorchScript), quantifié en int8
+(dynamique ou statique) ou exporté vers ONNX Runtime (dépendance optionnelle)
+
+Choix du backend côté API : variable d'environnement MUSHROOM_BACKEND
+"""
+
+import copy
+import glob
+import io
+import os
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from preprocessing import decode_image, new_batch
+
+# Optionnel : backend 'onnx'
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+BACKENDS = ('eager', 'folded', 'torchscript', 'int8-dynamic', 'int8-static', 'onnx')
+
+# Backends qui ont besoin d'images représentatives (calibration des échelles int8)
+NEEDS_CALIBRATION = ('int8-static',)
+
+INPUT_SHAPE = (3, 128, 128)
+
+
+def fold_batchnorm(model: nn.Module) -> nn.Module:
+    """Copie du modèle avec chaque BatchNorm2d replié dans la Conv2d qui la précède
+
+    Les paires sont prises dans l'ordre de déclaration des sous-modules (conv1/bn1,
+    conv2/bn2...), qui est aussi l'ordre d'appel dans forward pour MushroomCNN.
+    Les Dropout (sans effet en eval) sont remplacés par Identity.
+    """
+    folded = copy.deepcopy(model).eval()
+    previous_name, previous = None, None
+    for name, module in list(folded.named_children()):
+        if isinstance(module, nn.BatchNorm2d) and isinstance(previous, nn.Conv2d):
+            setattr(folded, previous_name, fuse_conv_bn_eval(previous, module))
+            setattr(folded, name, nn.Identity())
+        elif isinstance(module, nn.Dropout):
+            setattr(folded, name, nn.Identity())
+        previous_name, previous = name, module
+    return folded
+
+
+def to_torchscript(model: nn.Module, batch_size: int = 1) -> torch.jit.ScriptModule:
+    """Trace + freeze : constantes inlinées, fusions conv/relu de optimize_for_inference"""
+    example = torch.randn(batch_size, *INPUT_SHAPE)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+
+def quantize_dynamic(model: nn.Module) -> nn.Module:
+    """Poids des couches Linear en int8, activations quantifiées à la volée
+
+    fc1 (16384 x 512) porte l'essentiel des paramètres : c'est là que le gain est le plus net.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model: nn.Module, calibration_inputs: torch.Tensor) -> nn.Module:
+    """Quantification statique (FX) des convolutions et couches Linear
+
+    Les échelles des activations sont mesurées sur calibration_inputs (quelques dizaines
+    d'images réelles suffisent ; des entrées aléatoires donneraient des échelles fausses).
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = 'x86' if 'x86' in torch.backends.quantized.supported_engines else 'qnnpack'
+    torch.backends.quantized.engine = engine
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (calibration_inputs[:1],))
+    with torch.no_grad():
+        for start in range(0, len(calibration_inputs), 16):
+            prepared(calibration_inputs[start:start + 16])
+    return convert_fx(prepared)
+
+
+class OnnxModel(nn.Module):
+    """Session ONNX Runtime derrière l'interface d'un module PyTorch (logits en tenseur)"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        buffer = io.BytesIO()
+        torch.onnx.export(
+            model, torch.randn(1, *INPUT_SHAPE), buffer,
+            input_names=['input'], output_names=['logits'],
+            dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+            dynamo=False
+        )
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            buffer.getvalue(), options, providers=['CPUExecutionProvider'])
+
+    def forward(self, x):
+        logits = self.session.run(None, {'input': x.detach().cpu().numpy()})[0]
+        return torch.from_numpy(logits)
+
+
+def build_backend(name: str, model: nn.Module, calibration_inputs: torch.Tensor = None) -> nn.Module:
+    """Module prêt pour l'inférence CPU : model(inputs) -> logits, comme le modèle eager"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}' (expected one of {', '.join(BACKENDS)})")
+
+    model = model.cpu().eval()
+    if name == 'eager':
+        return model
+
+    folded = fold_batchnorm(model)
+    if name == 'folded':
+        return folded
+    if name == 'torchscript':
+        return to_torchscript(folded)
+    if name == 'int8-dynamic':
+        return quantize_dynamic(folded)
+    if name == 'int8-static':
+        if calibration_inputs is None or not len(calibration_inputs):
+            raise ValueError("int8-static needs calibration images")
+        return quantize_static(folded, calibration_inputs)
+
+    if onnxruntime is None:
+        raise ValueError("onnx backend requires the onnxruntime package")
+    return OnnxModel(folded)
+
+
+def load_images(directory: str, limit: int = None) -> torch.Tensor:
+    """Images d'un dossier (jpg/png), prétraitées comme par l'API, en un tenseur N x 3 x 128 x 128"""
+    paths = sorted(
+        path for pattern in ('*.jpg', '*.jpeg', '*.png')
+        for path in glob.glob(os.path.join(directory, '**', pattern), recursive=True)
+    )[:limit]
+    if not paths:
+        return torch.empty(0, *INPUT_SHAPE)
+    batch = new_batch(len(paths))
+    for i, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            decode_image(f.read(), out=batch[i])
+    return torch.from_numpy(batch)
@@ -3,131 +3,78 @@ API Flask pour la classification de champignons avec prédiction conforme
 Utilise un modèle PyTorch pré-entraîné pour l'inférence uniquement
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from PIL import Image
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
-from torchvision import transforms
 import numpy as np
-import io
+import base64
+import json
 import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import traceback
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": ["http://localhost:5173"]}})
+# Optionnel : réponses binaires application/x-msgpack
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 # Configuration
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Instrumentation partagée entre les APIs Python (server/instrumentation.py)
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+from instrumentation import Metrics, instrument_flask
+from batcher import MicroBatcher
+from preprocessing import decode_image, new_batch
+
+app = Flask(__name__)
+CORS(app, resources={r"/*": {"origins": ["http://localhost:5173"]}})
+
+metrics = Metrics('mushroom')
+instrument_flask(app, metrics)
 MODEL_PATH = os.path.join(SCRIPT_DIR, 'best_mushroom_model.pth')
 CALIBRATION_SCORES_PATH = os.path.join(SCRIPT_DIR, 'calibration_scores.npy')
 
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-print(f"Using device: {device}")
+# Backend d'inférence (voir inference_backends.py) et démarrage différé : avec
+# MUSHROOM_LAZY_START=1 le port s'ouvre tout de suite, torch et le modèle sont
+# chargés en arrière-plan et /health répond 'warming' en attendant
+INFERENCE_BACKEND = os.environ.get('MUSHROOM_BACKEND', 'eager')
+LAZY_START = os.environ.get('MUSHROOM_LAZY_START', '0') == '1'
+WARMING_RETRY_AFTER = 5
 
+runtime = None
+runtime_error = None
 
-# Architecture du modèle CNN (identique au notebook)
-class MushroomCNN(nn.Module):
-    def __init__(self, num_classes=169):
-        super(MushroomCNN, self).__init__()
-        
-        # Bloc 1
-        self.conv1 = nn.Conv2d(3, 32, kernel_size=3, padding=1)
-        self.bn1 = nn.BatchNorm2d(32)
-        self.conv2 = nn.Conv2d(32, 32, kernel_size=3, padding=1)
-        self.bn2 = nn.BatchNorm2d(32)
-        self.pool1 = nn.MaxPool2d(2, 2)
-        
-        # Bloc 2
-        self.conv3 = nn.Conv2d(32, 64, kernel_size=3, padding=1)
-        self.bn3 = nn.BatchNorm2d(64)
-        self.conv4 = nn.Conv2d(64, 64, kernel_size=3, padding=1)
-        self.bn4 = nn.BatchNorm2d(64)
-        self.pool2 = nn.MaxPool2d(2, 2)
-        
-        # Bloc 3
-        self.conv5 = nn.Conv2d(64, 128, kernel_size=3, padding=1)
-        self.bn5 = nn.BatchNorm2d(128)
-        self.conv6 = nn.Conv2d(128, 128, kernel_size=3, padding=1)
-        self.bn6 = nn.BatchNorm2d(128)
-        self.pool3 = nn.MaxPool2d(2, 2)
-        
-        # Bloc 4
-        self.conv7 = nn.Conv2d(128, 256, kernel_size=3, padding=1)
-        self.bn7 = nn.BatchNorm2d(256)
-        self.conv8 = nn.Conv2d(256, 256, kernel_size=3, padding=1)
-        self.bn8 = nn.BatchNorm2d(256)
-        self.pool4 = nn.MaxPool2d(2, 2)
-        
-        # FC
-        self.fc1 = nn.Linear(256 * 8 * 8, 512)
-        self.dropout1 = nn.Dropout(0.5)
-        self.fc2 = nn.Linear(512, 256)
-        self.dropout2 = nn.Dropout(0.5)
-        self.fc3 = nn.Linear(256, num_classes)
-    
-    def forward(self, x):
-        x = F.relu(self.bn1(self.conv1(x)))
-        x = F.relu(self.bn2(self.conv2(x)))
-        x = self.pool1(x)
-        
-        x = F.relu(self.bn3(self.conv3(x)))
-        x = F.relu(self.bn4(self.conv4(x)))
-        x = self.pool2(x)
-        
-        x = F.relu(self.bn5(self.conv5(x)))
-        x = F.relu(self.bn6(self.conv6(x)))
-        x = self.pool3(x)
-        
-        x = F.relu(self.bn7(self.conv7(x)))
-        x = F.relu(self.bn8(self.conv8(x)))
-        x = self.pool4(x)
-        
-        x = x.view(x.size(0), -1)
-        x = F.relu(self.fc1(x))
-        x = self.dropout1(x)
-        x = F.relu(self.fc2(x))
-        x = self.dropout2(x)
-        x = self.fc3(x)
-        
-        return x
 
+def load_runtime():
+    """Importe torch et charge le modèle (mushroom_runtime) puis publie le runtime"""
+    global runtime, runtime_error
+    try:
+        from mushroom_runtime import load_runtime as load
+        runtime = load(INFERENCE_BACKEND, metrics)
+    except Exception as e:
+        runtime_error = e
+        traceback.print_exc()
+        if not LAZY_START:
+            raise
 
-# Classe de prédiction conforme
-class ConformalPredictor:
-    def __init__(self, model, calibration_scores, alpha=0.1, device='cpu'):
-        self.model = model
-        self.alpha = alpha
-        self.device = device
-        self.calibration_scores = np.sort(calibration_scores)
-        
-    def predict(self, inputs):
-        """Créer des ensembles de prédiction conformes"""
-        self.model.eval()
-        
-        with torch.no_grad():
-            outputs = self.model(inputs)
-            probabilities = F.softmax(outputs, dim=1)
-            
-            # Calculer le seuil de calibration (comme dans le notebook)
-            n = len(self.calibration_scores)
-            q_level = np.ceil((n + 1) * (1 - self.alpha)) / n
-            q_level = min(q_level, 1.0)
-            threshold = np.quantile(self.calibration_scores, q_level)
-            
-            # Créer les ensembles de prédiction
-            # Score de non-conformité = 1 - probabilité
-            nonconformity_scores = 1 - probabilities
-            prediction_sets = nonconformity_scores <= threshold
-            
-            # GARANTIE: Toujours inclure au moins la classe top-1
-            # (évite les ensembles vides quand le seuil est trop strict)
-            for i in range(len(prediction_sets)):
-                if not prediction_sets[i].any():  # Si ensemble vide
-                    top1_idx = torch.argmax(probabilities[i])
-                    prediction_sets[i, top1_idx] = True
-            
-        return prediction_sets.cpu().numpy(), probabilities.cpu().numpy(), threshold
+
+def runtime_unavailable():
+    """Réponse 503 tant que le runtime n'est pas prêt (None sinon)"""
+    if runtime is not None:
+        return None
+    if runtime_error is not None:
+        return jsonify({'error': f'Model failed to load: {runtime_error}'}), 503
+    response = jsonify({'error': 'Model is warming up', 'status': 'warming'})
+    response.headers['Retry-After'] = str(WARMING_RETRY_AFTER)
+    return response, 503
 
 
 # Charger les noms réels des classes
@@ -152,44 +99,228 @@ else:
     TOXIC_SPECIES = ["Amanita muscaria", "Amanita phalloides", "Psilocybe cyanescens"]
     print(f"⚠️  Using default toxic species")
 
-# Transformation pour les images
-transform = transforms.Compose([
-    transforms.Resize((128, 128)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-])
+# Tables indexées par identifiant de classe (pas de recherche linéaire par requête)
+CLASS_NAMES = np.array(MUSHROOM_CLASSES, dtype=object)
+_toxic_set = set(TOXIC_SPECIES)
+TOXIC_MASK = np.array([name in _toxic_set for name in MUSHROOM_CLASSES], dtype=bool)
 
-# Charger le modèle pré-entraîné
-print(f"Loading model from: {MODEL_PATH}")
-model = MushroomCNN(num_classes=169)
+def run_predict_batch(items):
+    """Exécute un lot [(image 3x128x128, alpha, options), ...] et répartit les réponses"""
+    # Un seul thread exécute les lots : le buffer d'entrée est réutilisé d'un lot à l'autre
+    batch = np.stack([image for image, _, _ in items], out=_batch_buffer[:len(items)])
+    alphas = [alpha for _, alpha, _ in items]
+    pred_sets, probs, thresholds = runtime.predict(batch, alphas)
+    return build_results(pred_sets, probs, thresholds, alphas, [options for _, _, options in items])
 
-if os.path.exists(MODEL_PATH):
-    model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
-    print("✅ Pre-trained model loaded successfully!")
-else:
-    print("⚠️  Model file not found, using random initialization")
 
-model.eval()
-model = model.to(device)
+# Décodage + prétraitement hors du thread de la requête (PIL relâche le GIL) :
+# pendant qu'un lot passe dans le modèle, les images suivantes sont décodées
+decode_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('MUSHROOM_DECODE_WORKERS', os.cpu_count() or 4)),
+    thread_name_prefix='mushroom-decode'
+)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff')
 
-# Charger les scores de calibration
-if os.path.exists(CALIBRATION_SCORES_PATH):
-    calibration_scores = np.load(CALIBRATION_SCORES_PATH)
-    print(f"✅ Calibration scores loaded: {len(calibration_scores)} samples")
+predict_batcher = MicroBatcher(
+    run_predict_batch,
+    max_batch_size=int(os.environ.get('MUSHROOM_BATCH_SIZE', 16)),
+    max_wait_ms=float(os.environ.get('MUSHROOM_BATCH_WAIT_MS', 3.0)),
+    name='mushroom-batcher'
+)
+_batch_buffer = new_batch(predict_batcher.max_batch_size)
+
+if LAZY_START:
+    threading.Thread(target=load_runtime, name='mushroom-warmup', daemon=True).start()
 else:
-    # Scores par défaut (distribution Beta)
-    calibration_scores = np.random.beta(2, 5, size=1000)
-    print("⚠️  Using default calibration scores")
+    load_runtime()
+
+
+def top_k_indices(probs, k):
+    """Indices des k classes les plus probables de chaque ligne, triés (argpartition + tri de k)"""
+    n = probs.shape[1]
+    if k >= n:
+        return np.argsort(-probs, axis=1, kind='stable')
+    part = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+    part_probs = np.take_along_axis(probs, part, axis=1)
+    order = np.argsort(-part_probs, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+# Forme de la réponse : ensemble conforme seul, top-k ou les 169 classes (défaut,
+# compatible avec le frontend) ; encodage JSON lisible, compact ou msgpack
+RESPONSE_MODES = ('set', 'topk', 'full')
+RESPONSE_ENCODINGS = ('json', 'compact', 'msgpack')
+
+ResponseOptions = namedtuple('ResponseOptions', ['mode', 'k', 'encoding'])
+DEFAULT_OPTIONS = ResponseOptions('full', 5, 'json')
+
+
+def parse_alpha(values):
+    """Lit alpha (défaut 0.1) dans les champs de la requête : nombre dans ]0, 1[ (ValueError sinon)"""
+    try:
+        alpha = float(values.get('alpha', 0.1))
+    except ValueError:
+        raise ValueError("Invalid alpha (expected a number)")
+    if not 0 < alpha < 1:
+        raise ValueError("alpha must be between 0 and 1 (exclusive)")
+    return alpha
+
+
+def parse_response_options(values):
+    """Lit mode / k / encoding dans les champs de la requête (ValueError si invalide)"""
+    mode = values.get('mode', DEFAULT_OPTIONS.mode)
+    if mode not in RESPONSE_MODES:
+        raise ValueError(f"Invalid mode '{mode}' (expected one of {', '.join(RESPONSE_MODES)})")
+    
+    k = int(values.get('k', DEFAULT_OPTIONS.k))
+    if not 1 <= k <= len(MUSHROOM_CLASSES):
+        raise ValueError(f"k must be between 1 and {len(MUSHROOM_CLASSES)}")
+    
+    encoding = values.get('encoding', DEFAULT_OPTIONS.encoding)
+    if encoding not in RESPONSE_ENCODINGS:
+        raise ValueError(f"Invalid encoding '{encoding}' (expected one of {', '.join(RESPONSE_ENCODINGS)})")
+    if encoding == 'msgpack' and msgpack is None:
+        raise ValueError("msgpack encoding requires the msgpack package")
+    
+    return ResponseOptions(mode, k, encoding)
+
+
+def _ranked_count(options, num_classes):
+    """Nombre de classes classées à renvoyer (hors ensemble conforme)"""
+    if options.mode == 'full':
+        return num_classes
+    if options.mode == 'topk':
+        return options.k
+    return 0
+
+
+def build_results(pred_sets, probs, thresholds, alphas, options=None):
+    """Construit les réponses d'un lot d'images à partir de leurs ensembles conformes
+
+    L'ensemble conforme contient exactement les classes de probabilité >= 1 - seuil
+    (plus le top-1) : ce sont donc les set_size premières classes par probabilité.
+    Un seul top-k partiel couvre tout le lot, k étant le plus grand besoin des lignes.
+    """
+    num_classes = probs.shape[1]
+    options = options or [DEFAULT_OPTIONS] * len(probs)
+    set_sizes = pred_sets.sum(axis=1)
+    has_toxic = (pred_sets & TOXIC_MASK).any(axis=1)
+    
+    counts = [_ranked_count(opt, num_classes) for opt in options]
+    k = max(max(counts), int(set_sizes.max()))
+    ranked_indices = top_k_indices(probs, k)
+    ranked_probs = np.take_along_axis(probs, ranked_indices, axis=1)
+    
+    results = []
+    for i in range(len(probs)):
+        size = int(set_sizes[i])
+        predicted_indices = ranked_indices[i, :size]
+        toxic_indices = predicted_indices[TOXIC_MASK[predicted_indices]]
+        
+        if options[i].encoding != 'json':
+            results.append(_compact_result(
+                ranked_indices[i, :max(size, counts[i])], ranked_probs[i, :max(size, counts[i])],
+                size, bool(has_toxic[i]), toxic_indices, alphas[i], thresholds[i], options[i].encoding
+            ))
+            continue
+        
+        top1_idx = ranked_indices[i, 0]
+        result = {
+            # Ensemble de prédiction conforme
+            'predicted_classes': CLASS_NAMES[predicted_indices].tolist(),
+            'probabilities': ranked_probs[i, :size].tolist(),
+            'set_size': size,
+            
+            # Métadonnées
+            'coverage': 1 - alphas[i],
+            'top1_class': CLASS_NAMES[top1_idx],
+            'top1_prob': float(probs[i, top1_idx]),
+            'has_toxic': bool(has_toxic[i]),
+            'toxic_species': CLASS_NAMES[toxic_indices].tolist(),
+            'alpha': alphas[i],
+            'threshold': float(thresholds[i])
+        }
+        if counts[i]:
+            # Classes triées par probabilité (toutes en mode full, les k premières en topk)
+            result['all_classes'] = CLASS_NAMES[ranked_indices[i, :counts[i]]].tolist()
+            result['all_probabilities'] = ranked_probs[i, :counts[i]].tolist()
+        results.append(result)
+    
+    return results
+
+
+def _compact_result(class_ids, class_probs, set_size, has_toxic, toxic_ids, alpha, threshold, encoding):
+    """Réponse compacte : identifiants de classes (voir /classes) et probabilités float16
+
+    class_ids est trié par probabilité décroissante, ses set_size premiers éléments
+    forment l'ensemble conforme. Les probabilités sont en float16 little-endian,
+    en base64 pour l'encodage 'compact', en octets bruts pour 'msgpack'.
+    """
+    packed = class_probs.astype('<f2').tobytes()
+    return {
+        'class_ids': class_ids.tolist(),
+        'probabilities': base64.b64encode(packed).decode('ascii') if encoding == 'compact' else packed,
+        'set_size': set_size,
+        'has_toxic': has_toxic,
+        'toxic_ids': toxic_ids.tolist(),
+        'alpha': alpha,
+        'threshold': float(threshold)
+    }
+
+
+def encode_response(result, options):
+    if options.encoding == 'msgpack':
+        return Response(msgpack.packb(result), mimetype='application/x-msgpack')
+    return jsonify(result)
 
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Vérifier l'état de l'API"""
+    """Vérifier l'état de l'API ('warming' pendant le chargement différé du modèle)"""
+    if runtime is None:
+        return jsonify({
+            'status': 'error' if runtime_error is not None else 'warming',
+            'error': str(runtime_error) if runtime_error is not None else None,
+            'num_classes': 169,
+            'backend': INFERENCE_BACKEND
+        })
     return jsonify({
         'status': 'healthy',
-        'device': str(device),
-        'model_loaded': os.path.exists(MODEL_PATH),
-        'num_classes': 169
+        'device': str(runtime.device),
+        'model_loaded': runtime.model_loaded,
+        'num_classes': 169,
+        'backend': runtime.backend,
+        'batching': predict_batcher.stats()
+    })
+
+
+@app.route('/classes', methods=['GET'])
+def classes():
+    """Table identifiant -> nom de classe, pour décoder les réponses compactes"""
+    return jsonify({
+        'classes': MUSHROOM_CLASSES,
+        'toxic_ids': np.flatnonzero(TOXIC_MASK).tolist()
+    })
+
+
+@app.route('/calibration/reload', methods=['POST'])
+def reload_calibration():
+    """Recharge les scores de calibration depuis le disque (sans redémarrer l'API)"""
+    unavailable = runtime_unavailable()
+    if unavailable is not None:
+        return unavailable
+    if not os.path.exists(CALIBRATION_SCORES_PATH):
+        return jsonify({'error': 'Calibration file not found'}), 404
+    
+    try:
+        num_scores = runtime.reload_calibration()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'status': 'reloaded',
+        'num_scores': num_scores
     })
 
 
@@ -198,84 +329,175 @@ def predict():
     """
     Prédire l'espèce de champignon avec prédiction conforme
     """
+    unavailable = runtime_unavailable()
+    if unavailable is not None:
+        return unavailable
+    
     try:
         if 'image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
         
         image_file = request.files['image']
-        alpha = float(request.form.get('alpha', 0.1))
-        
-        # Charger et transformer l'image
-        image = Image.open(io.BytesIO(image_file.read())).convert('RGB')
-        image_tensor = transform(image).unsqueeze(0).to(device)
-        
-        # Prédicteur conforme
-        cp = ConformalPredictor(model, calibration_scores, alpha=alpha, device=device)
-        
-        # Prédiction
-        pred_sets, probs, threshold = cp.predict(image_tensor)
-        pred_set = pred_sets[0]
-        prob = probs[0]
-        
-        # Trier TOUTES les classes par probabilité (pour affichage complet)
-        all_indices = np.argsort(prob)[::-1]  # Du plus probable au moins probable
-        all_classes = [MUSHROOM_CLASSES[i] for i in all_indices]
-        all_probs = prob[all_indices]
-        
-        # Classes dans l'ensemble de prédiction conforme
-        predicted_indices = np.where(pred_set)[0]
-        predicted_probs = prob[predicted_indices]
+        try:
+            alpha = parse_alpha(request.form)
+            options = parse_response_options(request.values)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Trier par probabilité
-        sorted_indices = np.argsort(predicted_probs)[::-1]
-        predicted_indices = predicted_indices[sorted_indices]
-        predicted_probs = predicted_probs[sorted_indices]
+        # Décoder et prétraiter l'image sur le pool de décodage. Étape 'decode' comme
+        # dans /predict-batch : elle couvre aussi la normalisation (ex-étape 'transform')
+        with metrics.stage('decode'):
+            image = decode_pool.submit(decode_image, image_file.read()).result()
         
-        conformal_set_classes = [MUSHROOM_CLASSES[i] for i in predicted_indices]
-        
-        # Top-1
-        top1_idx = np.argmax(prob)
-        top1_class = MUSHROOM_CLASSES[top1_idx]
-        top1_prob = float(prob[top1_idx])
-        
-        # Vérifier toxicité
-        toxic_in_set = [cls for cls in conformal_set_classes if cls in TOXIC_SPECIES]
-        
-        result = {
-            # Ensemble de prédiction conforme
-            'predicted_classes': conformal_set_classes,
-            'probabilities': predicted_probs.tolist(),
-            'set_size': len(conformal_set_classes),
-            
-            # TOUTES les classes triées par probabilité
-            'all_classes': all_classes,
-            'all_probabilities': all_probs.tolist(),
-            
-            # Métadonnées
-            'coverage': 1 - alpha,
-            'top1_class': top1_class,
-            'top1_prob': top1_prob,
-            'has_toxic': len(toxic_in_set) > 0,
-            'toxic_species': toxic_in_set,
-            'alpha': alpha,
-            'threshold': float(threshold)
-        }
+        # Prédiction conforme, regroupée avec les requêtes concurrentes
+        result = predict_batcher.submit((image, alpha, options))
         
-        return jsonify(result)
+        with metrics.stage('serialize'):
+            return encode_response(result, options)
         
     except Exception as e:
         print(f"Error during prediction: {e}")
-        import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
+def _safe_decode(data, out):
+    try:
+        return decode_image(data, out)
+    except Exception as e:
+        return e
+
+
+def _iter_tar(fileobj):
+    # Lecture en flux (mode "r|") : l'archive n'est jamais chargée entièrement
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield member.name, archive.extractfile(member).read()
+
+
+def _iter_spooled(uploads, archive):
+    """Images de fichiers temporaires détenus par la réponse (fermés au fur et à mesure)"""
+    for name, spool in uploads:
+        with spool:
+            spool.seek(0)
+            yield name, spool.read()
+    
+    if archive is None:
+        return
+    with archive:
+        archive.seek(0)
+        if zipfile.is_zipfile(archive):
+            archive.seek(0)
+            with zipfile.ZipFile(archive) as zipped:
+                for name in zipped.namelist():
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield name, zipped.read(name)
+        else:
+            archive.seek(0)
+            yield from _iter_tar(archive)
+
+
+def _spool(file_storage):
+    # Flask ferme les fichiers de la requête dès le retour de la vue, avant la fin
+    # du streaming : on les recopie (par blocs) dans des fichiers temporaires à nous
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(file_storage.stream, spool)
+    return spool
+
+
+def iter_uploaded_images():
+    """Images de la requête, une à une : fichiers multiples, archive zip/tar, ou flux tar brut"""
+    if request.mimetype in ('application/x-tar', 'application/tar'):
+        return _iter_tar(request.stream)
+    
+    uploads = [(f.filename, _spool(f)) for f in request.files.getlist('images')]
+    archive = request.files.get('archive')
+    return _iter_spooled(uploads, _spool(archive) if archive is not None else None)
+
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@app.route('/predict-batch', methods=['POST'])
+def predict_batch():
+    """
+    Prédire plusieurs images en une requête, résultats en NDJSON au fil de l'eau
+
+    Entrées : champs multipart 'images' (multiples) et/ou 'archive' (zip ou tar),
+    ou corps application/x-tar. alpha, mode, k et encoding (json ou compact) en champ
+    de formulaire ou paramètre de requête, comme pour /predict.
+    Les images sont traitées par lots de MUSHROOM_BATCH_SIZE : la mémoire reste
+    constante quel que soit le nombre d'images envoyées.
+    """
+    try:
+        alpha = parse_alpha(request.values)
+        options = parse_response_options(request.values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if options.encoding == 'msgpack':
+        return jsonify({'error': "msgpack encoding is not available for NDJSON streams, use 'compact'"}), 400
+    unavailable = runtime_unavailable()
+    if unavailable is not None:
+        return unavailable
+    
+    images = iter_uploaded_images()
+    
+    def predict_chunk(chunk, futures, buffer, index):
+        with metrics.stage('decode'):
+            decoded = [future.result() for future in futures]
+        
+        valid = [i for i, image in enumerate(decoded) if not isinstance(image, Exception)]
+        results = {}
+        if valid:
+            alphas = [alpha] * len(valid)
+            batch = buffer[:len(chunk)] if len(valid) == len(chunk) else buffer[valid]
+            pred_sets, probs, thresholds = runtime.predict(batch, alphas)
+            shaped = build_results(pred_sets, probs, thresholds, alphas, [options] * len(valid))
+            for i, result in zip(valid, shaped):
+                results[i] = result
+        
+        for i, (name, _) in enumerate(chunk):
+            line = {'index': index + i, 'name': name}
+            if i in results:
+                line.update(results[i])
+            else:
+                line['error'] = f'Could not decode image: {decoded[i]}'
+            yield json.dumps(line) + '\n'
+    
+    def generate():
+        # Double buffer : le lot n+1 est décodé pendant l'inférence du lot n
+        size = predict_batcher.max_batch_size
+        buffers = (new_batch(size), new_batch(size))
+        index = 0
+        pending = None
+        for n, chunk in enumerate(iter_chunks(images, size)):
+            buffer = buffers[n % 2]
+            futures = [decode_pool.submit(_safe_decode, data, buffer[j]) for j, (_, data) in enumerate(chunk)]
+            if pending is not None:
+                yield from predict_chunk(*pending)
+                index += len(pending[0])
+            pending = (chunk, futures, buffer, index)
+        if pending is not None:
+            yield from predict_chunk(*pending)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 if __name__ == '__main__':
     print("\n" + "="*70)
     print("🍄 Mushroom Classification API with Conformal Prediction")
     print("="*70)
-    print(f"Device: {device}")
-    print(f"Model: MushroomCNN (169 classes)")
+    print(f"Device: {runtime.device if runtime is not None else 'loading in background'}")
+    print(f"Model: MushroomCNN (169 classes), backend: {INFERENCE_BACKEND}")
     print(f"Model file: {'✅ Found' if os.path.exists(MODEL_PATH) else '❌ Not found'}")
     print(f"Calibration: {'✅ Found' if os.path.exists(CALIBRATION_SCORES_PATH) else '⚠️  Using defaults'}")
     print(f"Server: http://localhost:8001")
@@ -0,0 +1,120 @@
+"""
+Architecture MushroomCNN (169 espèces), partagée par l'API et les scripts d'export/benchmark
+Chargement des poids depuis une copie pré-sérialisée, ouverte en mmap
+"""
+
+import os
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+# Architecture du modèle CNN (identique au notebook)
+class MushroomCNN(nn.Module):
+    def __init__(self, num_classes=169):
+        super(MushroomCNN, self).__init__()
+        
+        # Bloc 1
+        self.conv1 = nn.Conv2d(3, 32, kernel_size=3, padding=1)
+        self.bn1 = nn.BatchNorm2d(32)
+        self.conv2 = nn.Conv2d(32, 32, kernel_size=3, padding=1)
+        self.bn2 = nn.BatchNorm2d(32)
+        self.pool1 = nn.MaxPool2d(2, 2)
+        
+        # Bloc 2
+        self.conv3 = nn.Conv2d(32, 64, kernel_size=3, padding=1)
+        self.bn3 = nn.BatchNorm2d(64)
+        self.conv4 = nn.Conv2d(64, 64, kernel_size=3, padding=1)
+        self.bn4 = nn.BatchNorm2d(64)
+        self.pool2 = nn.MaxPool2d(2, 2)
+        
+        # Bloc 3
+        self.conv5 = nn.Conv2d(64, 128, kernel_size=3, padding=1)
+        self.bn5 = nn.BatchNorm2d(128)
+        self.conv6 = nn.Conv2d(128, 128, kernel_size=3, padding=1)
+        self.bn6 = nn.BatchNorm2d(128)
+        self.pool3 = nn.MaxPool2d(2, 2)
+        
+        # Bloc 4
+        self.conv7 = nn.Conv2d(128, 256, kernel_size=3, padding=1)
+        self.bn7 = nn.BatchNorm2d(256)
+        self.conv8 = nn.Conv2d(256, 256, kernel_size=3, padding=1)
+        self.bn8 = nn.BatchNorm2d(256)
+        self.pool4 = nn.MaxPool2d(2, 2)
+        
+        # FC
+        self.fc1 = nn.Linear(256 * 8 * 8, 512)
+        self.dropout1 = nn.Dropout(0.5)
+        self.fc2 = nn.Linear(512, 256)
+        self.dropout2 = nn.Dropout(0.5)
+        self.fc3 = nn.Linear(256, num_classes)
+    
+    def forward(self, x):
+        x = F.relu(self.bn1(self.conv1(x)))
+        x = F.relu(self.bn2(self.conv2(x)))
+        x = self.pool1(x)
+        
+        x = F.relu(self.bn3(self.conv3(x)))
+        x = F.relu(self.bn4(self.conv4(x)))
+        x = self.pool2(x)
+        
+        x = F.relu(self.bn5(self.conv5(x)))
+        x = F.relu(self.bn6(self.conv6(x)))
+        x = self.pool3(x)
+        
+        x = F.relu(self.bn7(self.conv7(x)))
+        x = F.relu(self.bn8(self.conv8(x)))
+        x = self.pool4(x)
+        
+        # reshape (et non view) : les sorties quantifiées ne sont pas forcément contiguës
+        x = x.reshape(x.size(0), -1)
+        x = F.relu(self.fc1(x))
+        x = self.dropout1(x)
+        x = F.relu(self.fc2(x))
+        x = self.dropout2(x)
+        x = self.fc3(x)
+        
+        return x
+
+
+def serving_weights_path(model_path: str) -> str:
+    """Copie de service des poids, à côté du .pth (best_mushroom_model.mmap.pt)"""
+    return os.path.splitext(model_path)[0] + '.mmap.pt'
+
+
+def export_serving_weights(model_path: str, serving_path: str):
+    """Réécrit le .pth en state_dict float32 contigu au format zip de torch.save
+
+    Ce format s'ouvre avec torch.load(mmap=True) : les tenseurs pointent dans le fichier.
+    Écriture atomique (fichier temporaire + rename) : plusieurs workers peuvent démarrer ensemble.
+    """
+    state = torch.load(model_path, map_location='cpu', weights_only=True)
+    state = {name: tensor.contiguous() for name, tensor in state.items()}
+    tmp_path = f'{serving_path}.{os.getpid()}.tmp'
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, serving_path)
+
+
+def load_model(model_path: str, device) -> tuple:
+    """MushroomCNN en mode eval, poids en mmap si possible -> (modèle, poids chargés ?)
+
+    Sur CPU les paramètres restent des vues sur le fichier : les pages sont celles du
+    cache disque, partagées entre tous les processus (workers forkés ou non) au lieu
+    d'une copie privée par worker. La copie de service est régénérée si le .pth change.
+    """
+    model = MushroomCNN(num_classes=169)
+    if not os.path.exists(model_path):
+        return model.eval().to(device), False
+
+    serving_path = serving_weights_path(model_path)
+    try:
+        if not os.path.exists(serving_path) or os.path.getmtime(serving_path) < os.path.getmtime(model_path):
+            export_serving_weights(model_path, serving_path)
+        state = torch.load(serving_path, map_location='cpu', mmap=True, weights_only=True)
+        model.load_state_dict(state, assign=True)
+    except OSError:
+        # Dossier en lecture seule : chargement classique, copie privée des poids
+        model.load_state_dict(torch.load(model_path, map_location='cpu', weights_only=True))
+
+    return model.eval().to(device), True
@@ -0,0 +1,180 @@
+"""
+Runtime d'inférence Mushroom : torch, modèle et prédicteur conforme
+Importé par mushroom_api au démarrage, ou en arrière-plan (MUSHROOM_LAZY_START=1)
+pour que le port s'ouvre avant l'import de torch et le chargement des poids
+"""
+
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from inference_backends import NEEDS_CALIBRATION, build_backend, load_images
+from mushroom_model import load_model
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(SCRIPT_DIR, 'best_mushroom_model.pth')
+CALIBRATION_SCORES_PATH = os.path.join(SCRIPT_DIR, 'calibration_scores.npy')
+QUANT_CALIBRATION_DIR = os.environ.get(
+    'MUSHROOM_QUANT_CALIBRATION_DIR', os.path.join(SCRIPT_DIR, '..', '..', 'public', 'samples'))
+
+
+# Classe de prédiction conforme
+class ConformalPredictor:
+    # Alphas précalculés au chargement de la calibration (pas de 0.01)
+    PRECOMPUTED_ALPHAS = [round(0.01 * k, 2) for k in range(1, 51)]
+    
+    def __init__(self, model, calibration_scores, alpha=0.1, device='cpu', metrics=None):
+        self.model = model
+        self.alpha = alpha
+        self.device = device
+        self.metrics = metrics
+        self.reload_calibration(calibration_scores)
+    
+    def reload_calibration(self, calibration_scores):
+        """Charge de nouveaux scores : un seul tri, puis table des seuils recalculée
+
+        Les scores déjà triés (ex. .npy ouvert en mmap) ne sont ni copiés ni retriés.
+        Le remplacement est atomique : les requêtes en cours gardent l'ancienne table.
+        ValueError si les scores sont vides (la table en place est conservée).
+        """
+        scores = np.asarray(calibration_scores)
+        if scores.size == 0:
+            raise ValueError("Calibration scores are empty")
+        if scores.size > 1 and not np.all(scores[1:] >= scores[:-1]):
+            scores = np.sort(scores)
+        thresholds = {alpha: self._quantile(scores, alpha) for alpha in self.PRECOMPUTED_ALPHAS}
+        self.calibration_scores, self._thresholds = scores, thresholds
+    
+    @staticmethod
+    def _quantile(sorted_scores, alpha):
+        """Quantile conforme en O(1) sur des scores triés
+
+        Même résultat que np.quantile(scores, q) (interpolation linéaire),
+        avec q = ceil((n + 1)(1 - alpha)) / n borné à [0, 1] (comme dans le notebook ;
+        un q négatif ferait indexer le tableau depuis la fin).
+        """
+        n = len(sorted_scores)
+        q_level = min(max(np.ceil((n + 1) * (1 - alpha)) / n, 0.0), 1.0)
+        position = q_level * (n - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, n - 1)
+        fraction = position - lower
+        return float(sorted_scores[lower] + fraction * (sorted_scores[upper] - sorted_scores[lower]))
+    
+    def threshold(self, alpha):
+        """Seuil de calibration pour un niveau alpha (mémoïsé par alpha)"""
+        thresholds = self._thresholds
+        value = thresholds.get(alpha)
+        if value is None:
+            value = self._quantile(self.calibration_scores, alpha)
+            # Borne la table : alphas arbitraires envoyés par les clients
+            if len(thresholds) < 1024:
+                thresholds[alpha] = value
+        return value
+    
+    def _stage(self, name):
+        return self.metrics.stage(name) if self.metrics is not None else nullcontext()
+    
+    def predict(self, inputs, alphas=None):
+        """Créer des ensembles de prédiction conformes
+
+        alphas : un alpha par image du lot (défaut : self.alpha pour toutes)
+        """
+        self.model.eval()
+        
+        if alphas is None:
+            alphas = [self.alpha] * len(inputs)
+        
+        with torch.no_grad():
+            with self._stage('forward'):
+                outputs = self.model(inputs)
+                probabilities = F.softmax(outputs, dim=1)
+            
+            with self._stage('conformal'):
+                # Un seuil par image : les requêtes d'un même lot peuvent avoir des alpha différents
+                thresholds = np.array([self.threshold(a) for a in alphas])
+                
+                # Créer les ensembles de prédiction
+                # Score de non-conformité = 1 - probabilité
+                nonconformity_scores = 1 - probabilities
+                threshold_column = torch.as_tensor(thresholds, dtype=probabilities.dtype,
+                                                   device=probabilities.device).unsqueeze(1)
+                prediction_sets = nonconformity_scores <= threshold_column
+                
+                # GARANTIE: Toujours inclure au moins la classe top-1
+                # (évite les ensembles vides quand le seuil est trop strict)
+                # Insertion masquée sur tout le lot, sans boucle Python
+                empty = ~prediction_sets.any(dim=1)
+                top1 = probabilities.argmax(dim=1)
+                rows = torch.arange(len(prediction_sets), device=prediction_sets.device)
+                prediction_sets[rows, top1] |= empty
+            
+        return prediction_sets.cpu().numpy(), probabilities.cpu().numpy(), thresholds
+
+
+def load_calibration_scores():
+    if os.path.exists(CALIBRATION_SCORES_PATH):
+        # mmap : un fichier déjà trié (voir generate_calibration.py) n'est pas copié en mémoire
+        calibration_scores = np.load(CALIBRATION_SCORES_PATH, mmap_mode='r')
+        print(f"✅ Calibration scores loaded: {len(calibration_scores)} samples")
+    else:
+        # Scores par défaut (distribution Beta)
+        calibration_scores = np.random.beta(2, 5, size=1000)
+        print("⚠️  Using default calibration scores")
+    return calibration_scores
+
+
+class Runtime:
+    """Modèle chargé + prédicteur conforme partagé par toutes les requêtes"""
+    
+    def __init__(self, device, model, backend, model_loaded, conformal_predictor):
+        self.device = device
+        self.model = model
+        self.backend = backend
+        self.model_loaded = model_loaded
+        self.conformal_predictor = conformal_predictor
+    
+    def predict(self, batch, alphas):
+        """Lot prétraité N x 3 x 128 x 128 (float32, voir preprocessing) -> (ensembles, probabilités, seuils)
+
+        Sur CPU le tenseur partage la mémoire du tableau NumPy (aucune copie).
+        """
+        inputs = torch.from_numpy(np.ascontiguousarray(batch)).to(self.device)
+        return self.conformal_predictor.predict(inputs, alphas)
+    
+    def reload_calibration(self):
+        self.conformal_predictor.reload_calibration(np.load(CALIBRATION_SCORES_PATH, mmap_mode='r'))
+        return len(self.conformal_predictor.calibration_scores)
+
+
+def load_runtime(backend='eager', metrics=None) -> Runtime:
+    """Charge modèle, backend d'inférence et calibration (plusieurs secondes à froid)"""
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    print(f"Using device: {device}")
+    
+    # Charger le modèle pré-entraîné (poids en mmap, voir mushroom_model.load_model)
+    print(f"Loading model from: {MODEL_PATH}")
+    model, model_loaded = load_model(MODEL_PATH, device)
+    if model_loaded:
+        print("✅ Pre-trained model loaded successfully!")
+    else:
+        print("⚠️  Model file not found, using random initialization")
+    
+    # Backend d'inférence (voir inference_backends.py et benchmark_backends.py)
+    if backend != 'eager' and device.type != 'cpu':
+        print(f"⚠️  Backend '{backend}' is CPU-only, using eager on {device}")
+        backend = 'eager'
+    if backend != 'eager':
+        calibration_inputs = None
+        if backend in NEEDS_CALIBRATION:
+            calibration_inputs = load_images(QUANT_CALIBRATION_DIR, limit=256)
+        model = build_backend(backend, model, calibration_inputs)
+        print(f"✅ Inference backend: {backend}")
+    
+    # Prédicteur partagé : les requêtes concurrentes sont regroupées en un seul forward
+    conformal_predictor = ConformalPredictor(
+        model, load_calibration_scores(), alpha=0.1, device=device, metrics=metrics)
+    return Runtime(device, model, backend, model_loaded, conformal_predictor)
@@ -0,0 +1,55 @@
+"""
+Prétraitement des images Mushroom (PIL + NumPy, sans torch)
+Décodage JPEG à résolution réduite (mode draft), redimensionnement 128x128,
+puis conversion et normalisation en une passe dans un buffer float32 préalloué
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE = 128
+
+# Taille minimale du décodage réduit : 2x la cible, la réduction DCT seule à 128 px
+# dégrade trop les petites images (écart visible avec le prétraitement d'entraînement)
+DRAFT_SIZE = 2 * IMAGE_SIZE
+
+# Normalisation ImageNet (identique à l'entraînement)
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# (x / 255 - mean) / std == x * SCALE + OFFSET, par canal
+SCALE = (1.0 / (255.0 * STD)).reshape(3, 1, 1)
+OFFSET = (-MEAN / STD).reshape(3, 1, 1)
+
+
+def load_rgb(data: bytes) -> Image.Image:
+    """Octets d'une image -> image PIL RGB 128x128
+
+    Pour un JPEG, draft() fait décoder directement à 1/2, 1/4 ou 1/8 de la taille
+    (en restant au moins à DRAFT_SIZE px) : une photo de 12 MP n'est jamais décodée en entier.
+    """
+    image = Image.open(io.BytesIO(data))
+    image.draft('RGB', (DRAFT_SIZE, DRAFT_SIZE))
+    return image.convert('RGB').resize((IMAGE_SIZE, IMAGE_SIZE), Image.BILINEAR)
+
+
+def normalize_into(image: Image.Image, out: np.ndarray) -> np.ndarray:
+    """Pixels HWC uint8 -> CHW float32 normalisé, écrit dans out (3x128x128)"""
+    pixels = np.asarray(image, dtype=np.uint8).transpose(2, 0, 1)
+    np.multiply(pixels, SCALE, out=out)
+    out += OFFSET
+    return out
+
+
+def new_batch(size: int) -> np.ndarray:
+    """Buffer d'un lot d'images prétraitées (N x 3 x 128 x 128)"""
+    return np.empty((size, 3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+
+
+def decode_image(data: bytes, out: np.ndarray = None) -> np.ndarray:
+    """Octets d'une image -> tableau 3x128x128 prêt pour le modèle (dans out si fourni)"""
+    if out is None:
+        out = np.empty((3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+    return normalize_into(load_rgb(data), out)
@@ -0,0 +1,153 @@
+"""
+Résolution de grilles Sudoku par lots
+Répartition sur un pool de processus, résultats rendus au fil de l'eau
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, Optional
+
+from sudoku_engine import BitmaskSolver, SolverTimeout
+
+DEFAULT_TIMEOUT = 5.0
+# Borne du timeout par grille demandé par un client
+MAX_TIMEOUT = 30.0
+
+
+def is_grid(grid) -> bool:
+    """Vérifie le format : 9 lignes de 9 entiers entre 0 et 9"""
+    return (
+        isinstance(grid, list) and len(grid) == 9
+        and all(isinstance(row, list) and len(row) == 9 for row in grid)
+        and all(isinstance(v, int) and 0 <= v <= 9 for row in grid for v in row)
+    )
+
+
+def parse_timeout(value) -> float:
+    """Timeout par grille envoyé par un client -> secondes, ramené à MAX_TIMEOUT
+
+    ValueError si ce n'est pas un nombre strictement positif.
+    """
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('timeout must be a number')
+    if not timeout > 0:
+        raise ValueError('timeout must be positive')
+    return min(timeout, MAX_TIMEOUT)
+
+
+def solve_one(index: int, grid, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """Résout une grille (exécuté dans un processus du pool)
+
+    status : solved | unsolvable | invalid | timeout
+    """
+    start = time.monotonic()
+    result = {'index': index}
+
+    if not is_grid(grid):
+        result['status'] = 'invalid'
+        result['error'] = 'Invalid grid format'
+        return result
+
+    solver = BitmaskSolver(deadline=start + timeout)
+    grid_copy = [row[:] for row in grid]
+    try:
+        solved = solver.solve(grid_copy)
+    except SolverTimeout:
+        result['status'] = 'timeout'
+    else:
+        result['status'] = 'solved' if solved else 'unsolvable'
+        if solved:
+            result['solution'] = grid_copy
+
+    result['solverCalls'] = solver.calls
+    result['timeMs'] = round((time.monotonic() - start) * 1000, 3)
+    return result
+
+
+class BatchSolver:
+    """Pool de processus pour résoudre des milliers de grilles"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Nombre de grilles soumises simultanément : borne la mémoire sur un flux
+        self.max_in_flight = max_in_flight or self.max_workers * 8
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Création paresseuse dans le processus qui sert les requêtes. "fork" évite
+        # de réimporter le module principal (et de relancer la réserve de puzzles)
+        # dans chaque enfant ; les enfants n'exécutent que solve_one, sans verrou partagé
+        if self._executor is None:
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(method)
+            )
+        return self._executor
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        """Oublie un pool cassé (enfant tué : OOM, signal) : le prochain appel en crée un neuf"""
+        if self._executor is pool:
+            self._executor = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, index: int, grid, timeout: float):
+        """Soumet une grille -> (future, pool qui la traite)"""
+        pool = self._pool()
+        try:
+            return pool.submit(solve_one, index, grid, timeout), pool
+        except BrokenProcessPool:
+            self._discard(pool)
+            pool = self._pool()
+            return pool.submit(solve_one, index, grid, timeout), pool
+
+    def solve_iter(self, grids: Iterable, timeout: float = DEFAULT_TIMEOUT) -> Iterator[dict]:
+        """Résout les grilles (liste ou générateur) et les rend dans l'ordre de terminaison
+
+        Chaque résultat porte l'index de la grille dans l'entrée. Si un processus du
+        pool meurt, les grilles en cours sont rendues en erreur et la suite du lot
+        part sur un pool neuf.
+        """
+        pending = {}
+        grids = iter(enumerate(grids))
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < self.max_in_flight:
+                try:
+                    index, grid = next(grids)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future, pool = self._submit(index, grid, timeout)
+                pending[future] = (index, pool)
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, pool = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    self._discard(pool)
+                    result = {'index': index, 'status': 'error', 'error': str(e) or 'Worker process died'}
+                except Exception as e:
+                    result = {'index': index, 'status': 'error', 'error': str(e)}
+                yield result
+
+    def solve_all(self, grids: Iterable, timeout: float = DEFAULT_TIMEOUT) -> list:
+        """Version bloquante : résultats triés par index"""
+        results = list(self.solve_iter(grids, timeout))
+        return sorted(results, key=lambda r: r['index'])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
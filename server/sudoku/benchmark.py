@@ -0,0 +1,221 @@
+"""
+Benchmark du solveur et du générateur Sudoku
+Corpus fournis dans corpus/, rapport JSON (ops/s, p50/p99, allocations),
+comparaison optionnelle avec le binaire C de ocr_sudoku et avec un rapport de référence
+
+Usage (depuis server/sudoku) :
+    python benchmark.py                              # rapport JSON sur la sortie standard
+    python benchmark.py -o bench.json                # rapport dans un fichier
+    python benchmark.py --baseline bench.json        # échoue si régression > 20 %
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List
+
+from sudoku_engine import BitmaskSolver
+from sudoku_game import SudokuGame
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(SCRIPT_DIR, 'corpus')
+OCR_DIR = os.path.join(SCRIPT_DIR, '..', 'ocr_sudoku')
+C_SOLVER = os.path.join(OCR_DIR, 'build', 'sudoku_solver')
+TEST_IMAGES = os.path.join(SCRIPT_DIR, '..', '..', 'public', 'test_images_sudoku')
+
+DIFFICULTIES = ['easy', 'medium', 'hard', 'expert']
+
+
+def load_corpus(name: str) -> List[List[List[int]]]:
+    """Une grille par ligne (81 caractères, 0 ou . pour une case vide), # pour les commentaires"""
+    grids = []
+    with open(os.path.join(CORPUS_DIR, f'{name}.txt'), 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            cells = [0 if ch in '.0' else int(ch) for ch in line]
+            grids.append([cells[r * 9:r * 9 + 9] for r in range(9)])
+    return grids
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def summarize(timings: List[float]) -> dict:
+    timings = sorted(timings)
+    total = sum(timings)
+    return {
+        'count': len(timings),
+        'ops_per_s': round(len(timings) / total, 2) if total else None,
+        'mean_ms': round(total / len(timings) * 1000, 4) if timings else None,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 4),
+        'max_ms': round(timings[-1] * 1000, 4) if timings else None
+    }
+
+
+def measure_allocations(func: Callable[[], object], samples: int) -> dict:
+    """Pic mémoire et nombre de blocs alloués par appel (passe séparée, tracemalloc ralentit)"""
+    peaks, blocks = [], []
+    for _ in range(samples):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        func()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = after.compare_to(before, 'filename')
+        blocks.append(sum(max(s.count_diff, 0) for s in stats))
+        peaks.append(peak)
+    return {
+        'peak_kb': round(max(peaks) / 1024, 2),
+        'retained_blocks': max(blocks)
+    }
+
+
+def bench_solver(name: str, repeat: int) -> dict:
+    grids = load_corpus(name)
+    timings, calls, solved = [], [], 0
+
+    for _ in range(repeat):
+        for grid in grids:
+            work = [row[:] for row in grid]
+            solver = BitmaskSolver()
+            start = time.perf_counter()
+            ok = solver.solve(work)
+            timings.append(time.perf_counter() - start)
+            calls.append(solver.calls)
+            solved += ok
+
+    result = summarize(timings)
+    result['solved'] = solved
+    result['mean_solver_calls'] = round(sum(calls) / len(calls), 2)
+    result['allocations'] = measure_allocations(
+        lambda: BitmaskSolver().solve([row[:] for row in grids[0]]), samples=3
+    )
+    return result
+
+
+def bench_generation(difficulty: str, samples: int, seed: int) -> dict:
+    game = SudokuGame(random.Random(seed))
+    timings, calls, clues = [], [], []
+
+    for _ in range(samples):
+        start = time.perf_counter()
+        puzzle, _ = game.generate_puzzle(difficulty)
+        timings.append(time.perf_counter() - start)
+        calls.append(game.last_solver_calls)
+        clues.append(sum(1 for row in puzzle for v in row if v))
+
+    result = summarize(timings)
+    result['mean_solver_calls'] = round(sum(calls) / len(calls), 2)
+    result['mean_clues'] = round(sum(clues) / len(clues), 2)
+    result['allocations'] = measure_allocations(lambda: game.generate_puzzle(difficulty), samples=3)
+    return result
+
+
+def bench_c_pipeline(binary: str, repeat: int) -> dict:
+    """Pipeline C complet (OCR + résolution) sur les images de test
+
+    Le binaire ne prend qu'une image en entrée : la mesure inclut prétraitement,
+    détection, CNN et résolution, à comparer avec prudence au solveur Python seul.
+    """
+    if not os.path.exists(binary):
+        return {'skipped': f'binary not found: {binary}'}
+
+    images = sorted(glob.glob(os.path.join(TEST_IMAGES, '*.png')))
+    if not images:
+        return {'skipped': f'no test images in {TEST_IMAGES}'}
+
+    # Répertoire de travail isolé : le binaire écrit ses images de debug dans le cwd
+    workdir = tempfile.mkdtemp(prefix='sudoku_bench_')
+    try:
+        os.symlink(os.path.abspath(os.path.join(OCR_DIR, 'models')), os.path.join(workdir, 'models'))
+        timings, failures = [], 0
+        for _ in range(repeat):
+            for image in images:
+                start = time.perf_counter()
+                proc = subprocess.run(
+                    [os.path.abspath(binary), image, os.path.join(workdir, 'out.png')],
+                    cwd=workdir, capture_output=True, timeout=60
+                )
+                timings.append(time.perf_counter() - start)
+                failures += proc.returncode != 0
+        result = summarize(timings)
+        result['failures'] = failures
+        result['images'] = [os.path.basename(i) for i in images]
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Liste les mesures dont le p50 a régressé de plus de `threshold` (fraction)"""
+    regressions = []
+    for section in ('solver', 'generation'):
+        for name, current in report.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or not previous.get('p50_ms'):
+                continue
+            ratio = current['p50_ms'] / previous['p50_ms']
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{section}/{name}: p50 {previous['p50_ms']}ms -> {current['p50_ms']}ms (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark du solveur/générateur Sudoku')
+    parser.add_argument('-o', '--output', help='Fichier JSON de sortie (défaut : stdout)')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes sur chaque corpus')
+    parser.add_argument('--samples', type=int, default=100, help='Puzzles générés par difficulté')
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--c-solver', default=C_SOLVER, help='Binaire C à comparer')
+    parser.add_argument('--skip-c', action='store_true', help='Ne pas lancer le binaire C')
+    parser.add_argument('--baseline', help='Rapport JSON de référence')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Régression tolérée (0.2 = 20 %%)')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'solver': {name: bench_solver(name, args.repeat) for name in ('easy', 'minimal17', 'hostile')},
+        'generation': {d: bench_generation(d, args.samples, args.seed) for d in DIFFICULTIES}
+    }
+    if not args.skip_c:
+        report['c_pipeline'] = bench_c_pipeline(args.c_solver, repeat=1)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
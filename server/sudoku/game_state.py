@@ -0,0 +1,82 @@
+"""
+État incrémental d'une partie Sudoku
+Grille courante + compteurs de chiffres par ligne/colonne/carré, mis à jour coup par coup
+"""
+
+from typing import List, Optional
+
+from sudoku_engine import BOX_OF, COL_OF, PEERS, ROW_OF
+
+# Unités d'une case : ligne (0..8), colonne (9..17), carré (18..26)
+CELL_UNITS = [(ROW_OF[i], 9 + COL_OF[i], 18 + BOX_OF[i]) for i in range(81)]
+
+
+class GameState:
+    """Grille du joueur et nombre d'occurrences de chaque chiffre dans chaque unité
+
+    counts[u * 10 + d] = nombre de cases de l'unité u contenant d : un coup met à
+    jour 3 compteurs, la validation et les candidats se lisent en temps constant.
+    """
+
+    __slots__ = ('cells', 'givens', 'counts')
+
+    def __init__(self, cells: bytearray, givens: bytes, counts: bytearray):
+        self.cells = cells
+        self.givens = givens
+        self.counts = counts
+
+    @classmethod
+    def new(cls, puzzle: bytes, current: Optional[bytes] = None) -> 'GameState':
+        cells = bytearray(current if current is not None else puzzle)
+        counts = bytearray(270)
+        for idx in range(81):
+            d = cells[idx]
+            if d:
+                for u in CELL_UNITS[idx]:
+                    counts[u * 10 + d] += 1
+        return cls(cells, bytes(puzzle), counts)
+
+    @classmethod
+    def from_bytes(cls, puzzle: bytes, current: bytes, counts: bytes) -> 'GameState':
+        return cls(bytearray(current), bytes(puzzle), bytearray(counts))
+
+    def is_given(self, idx: int) -> bool:
+        return self.givens[idx] != 0
+
+    def is_allowed(self, idx: int, value: int) -> bool:
+        """Le chiffre est-il absent des unités de la case (la case elle-même exclue)"""
+        own = 1 if self.cells[idx] == value else 0
+        counts = self.counts
+        return all(counts[u * 10 + value] - own == 0 for u in CELL_UNITS[idx])
+
+    def set(self, idx: int, value: int):
+        """Joue (ou efface avec 0) une valeur dans une case non fixée"""
+        old = self.cells[idx]
+        if old == value:
+            return
+        counts = self.counts
+        units = CELL_UNITS[idx]
+        if old:
+            for u in units:
+                counts[u * 10 + old] -= 1
+        if value:
+            for u in units:
+                counts[u * 10 + value] += 1
+        self.cells[idx] = value
+
+    def conflicts(self, idx: int) -> List[int]:
+        """Cases voisines contenant le même chiffre que la case"""
+        value = self.cells[idx]
+        if not value:
+            return []
+        if self.is_allowed(idx, value):
+            return []
+        cells = self.cells
+        return [p for p in PEERS[idx] if cells[p] == value]
+
+    def candidates(self, idx: int) -> List[int]:
+        """Chiffres encore jouables dans la case selon la grille courante"""
+        return [d for d in range(1, 10) if self.is_allowed(idx, d)]
+
+    def is_complete(self) -> bool:
+        return 0 not in self.cells
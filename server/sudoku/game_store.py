@@ -0,0 +1,349 @@
+"""
+Stockage des parties Sudoku en cours
+Expiration (TTL) + éviction LRU, grilles encodées sur 81 octets,
+backend en mémoire ou fichier SQLite local (partagé entre processus)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from game_state import GameState
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_GAMES = 10000
+
+
+def encode_grid(grid: List[List[int]]) -> bytes:
+    """Grille 9x9 -> 81 octets (une case par octet, 0 = vide)"""
+    return bytes(v for row in grid for v in row)
+
+
+def decode_grid(data: bytes) -> List[List[int]]:
+    """81 octets -> grille 9x9"""
+    return [list(data[r * 9:r * 9 + 9]) for r in range(9)]
+
+
+class MemoryBackend:
+    """Backend en mémoire du processus : OrderedDict trié du moins au plus récemment utilisé"""
+
+    # Verrous de partie (par hachage de l'id) : un coup = lecture + écriture atomiques
+    MOVE_LOCKS = 64
+
+    def __init__(self):
+        self._games: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._move_locks = [threading.Lock() for _ in range(self.MOVE_LOCKS)]
+
+    def get(self, game_id: str, now: float, ttl: float) -> Optional[dict]:
+        with self._lock:
+            record = self._games.get(game_id)
+            if record is None:
+                return None
+            if record['expires'] <= now:
+                del self._games[game_id]
+                return None
+            record['accessed'] = now
+            record['expires'] = now + ttl
+            self._games.move_to_end(game_id)
+            return record
+
+    def put(self, game_id: str, record: dict):
+        with self._lock:
+            self._games[game_id] = record
+            self._games.move_to_end(game_id)
+
+    def update(self, game_id: str, fields: dict) -> bool:
+        with self._lock:
+            record = self._games.get(game_id)
+            if record is None:
+                return False
+            record.update(fields)
+            return True
+
+    def modify(self, game_id: str, now: float, ttl: float, mutate) -> Optional[dict]:
+        """Lit la partie, applique mutate(record) -> champs à écrire (ou None), sans
+        qu'un autre coup sur la même partie s'intercale ; None si inconnue ou expirée"""
+        with self._move_locks[hash(game_id) % self.MOVE_LOCKS]:
+            record = self.get(game_id, now, ttl)
+            if record is None:
+                return None
+            fields = mutate(record)
+            if fields:
+                self.update(game_id, fields)
+            return record
+
+    def delete(self, game_id: str):
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def evict(self, now: float, max_games: int) -> int:
+        """Supprime les parties expirées puis les moins récentes au-delà de max_games"""
+        removed = 0
+        with self._lock:
+            expired = [gid for gid, rec in self._games.items() if rec['expires'] <= now]
+            for gid in expired:
+                del self._games[gid]
+            removed += len(expired)
+            while len(self._games) > max_games:
+                self._games.popitem(last=False)
+                removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+
+class SQLiteBackend:
+    """Backend fichier SQLite (mode WAL) : survit aux redémarrages, partageable entre workers"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS games (
+            id TEXT PRIMARY KEY,
+            puzzle BLOB NOT NULL,
+            solution BLOB NOT NULL,
+            difficulty TEXT NOT NULL,
+            current BLOB,
+            counts BLOB,
+            accessed REAL NOT NULL,
+            expires REAL NOT NULL
+        )
+    """
+
+    # Colonnes ajoutées après la première version du schéma
+    MIGRATIONS = {
+        'current': "ALTER TABLE games ADD COLUMN current BLOB",
+        'counts': "ALTER TABLE games ADD COLUMN counts BLOB"
+    }
+
+    def __init__(self, path: str, touch_interval: float = 60.0):
+        self.path = path
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(self.SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(games)")}
+        for column, statement in self.MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(statement)
+        conn.execute("CREATE INDEX IF NOT EXISTS games_accessed ON games (accessed)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Une connexion par thread : sqlite3 n'autorise pas le partage par défaut
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, game_id: str, now: float, ttl: float) -> Optional[dict]:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT puzzle, solution, difficulty, current, counts, accessed, expires "
+            "FROM games WHERE id = ?",
+            (game_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[6] <= now:
+            conn.execute("DELETE FROM games WHERE id = ?", (game_id,))
+            conn.commit()
+            return None
+        # Une seule écriture à la fois en WAL : la date d'accès n'est rafraîchie
+        # que si elle est ancienne, les lectures restent concurrentes entre workers
+        if now - row[5] > self.touch_interval:
+            conn.execute("UPDATE games SET accessed = ?, expires = ? WHERE id = ?",
+                         (now, now + ttl, game_id))
+            conn.commit()
+        return {'puzzle': row[0], 'solution': row[1], 'difficulty': row[2],
+                'current': row[3], 'counts': row[4], 'expires': row[6]}
+
+    def put(self, game_id: str, record: dict):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO games "
+            "(id, puzzle, solution, difficulty, current, counts, accessed, expires) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (game_id, record['puzzle'], record['solution'], record['difficulty'],
+             record['current'], record['counts'], record['accessed'], record['expires'])
+        )
+        conn.commit()
+
+    def update(self, game_id: str, fields: dict) -> bool:
+        conn = self._conn()
+        assignments = ', '.join(f"{column} = ?" for column in fields)
+        updated = conn.execute(
+            f"UPDATE games SET {assignments} WHERE id = ?",
+            (*fields.values(), game_id)
+        ).rowcount
+        conn.commit()
+        return updated > 0
+
+    def modify(self, game_id: str, now: float, ttl: float, mutate) -> Optional[dict]:
+        """Comme MemoryBackend.modify : BEGIN IMMEDIATE prend le verrou d'écriture avant
+        la lecture, un coup concurrent (autre thread ou worker) attend son tour"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT puzzle, solution, difficulty, current, counts, expires FROM games WHERE id = ?",
+                (game_id,)
+            ).fetchone()
+            if row is None or row[5] <= now:
+                if row is not None:
+                    conn.execute("DELETE FROM games WHERE id = ?", (game_id,))
+                conn.commit()
+                return None
+            record = {'puzzle': row[0], 'solution': row[1], 'difficulty': row[2],
+                      'current': row[3], 'counts': row[4], 'expires': row[5]}
+            fields = mutate(record)
+            if fields:
+                fields = {**fields, 'accessed': now, 'expires': now + ttl}
+                assignments = ', '.join(f"{column} = ?" for column in fields)
+                conn.execute(f"UPDATE games SET {assignments} WHERE id = ?", (*fields.values(), game_id))
+            conn.commit()
+            return record
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def delete(self, game_id: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM games WHERE id = ?", (game_id,))
+        conn.commit()
+
+    def evict(self, now: float, max_games: int) -> int:
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM games WHERE expires <= ?", (now,)).rowcount
+        removed += conn.execute(
+            "DELETE FROM games WHERE id IN ("
+            "SELECT id FROM games ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (max_games,)
+        ).rowcount
+        conn.commit()
+        return removed
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+class GameStore:
+    """Parties en cours avec expiration glissante et nombre maximal de parties"""
+
+    def __init__(self, backend=None, ttl: float = DEFAULT_TTL, max_games: int = DEFAULT_MAX_GAMES,
+                 evict_every: int = 100):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.max_games = max_games
+        # L'éviction complète est amortie sur plusieurs écritures
+        self.evict_every = evict_every
+        self._writes = 0
+
+    def save(self, game_id: str, puzzle: List[List[int]], solution: List[List[int]], difficulty: str):
+        now = time.time()
+        puzzle_bytes = encode_grid(puzzle)
+        state = GameState.new(puzzle_bytes)
+        self.backend.put(game_id, {
+            'puzzle': puzzle_bytes,
+            'solution': encode_grid(solution),
+            'difficulty': difficulty,
+            'current': bytes(state.cells),
+            'counts': bytes(state.counts),
+            'accessed': now,
+            'expires': now + self.ttl
+        })
+        self._writes += 1
+        if self._writes % self.evict_every == 0:
+            self.backend.evict(now, self.max_games)
+
+    def get(self, game_id: str) -> Optional[dict]:
+        """Retourne la partie décodée (None si inconnue ou expirée)"""
+        if not game_id:
+            return None
+        record = self.backend.get(game_id, time.time(), self.ttl)
+        if record is None:
+            return None
+        current = record.get('current') or record['puzzle']
+        return {
+            'puzzle': decode_grid(record['puzzle']),
+            'solution': decode_grid(record['solution']),
+            'current': decode_grid(current),
+            'difficulty': record['difficulty']
+        }
+
+    def load_state(self, game_id: str) -> Optional[GameState]:
+        """État incrémental de la partie (grille du joueur + compteurs par unité)"""
+        if not game_id:
+            return None
+        record = self.backend.get(game_id, time.time(), self.ttl)
+        if record is None:
+            return None
+        return self._state(record)
+
+    @staticmethod
+    def _state(record: dict) -> GameState:
+        if record.get('current') is None or record.get('counts') is None:
+            # Partie enregistrée avant l'ajout de l'état incrémental
+            return GameState.new(record['puzzle'])
+        return GameState.from_bytes(record['puzzle'], record['current'], record['counts'])
+
+    @staticmethod
+    def _state_fields(state: GameState) -> dict:
+        return {'current': bytes(state.cells), 'counts': bytes(state.counts)}
+
+    def save_state(self, game_id: str, state: GameState) -> bool:
+        return self.backend.update(game_id, self._state_fields(state))
+
+    def modify_state(self, game_id: str, mutate) -> Optional[GameState]:
+        """Applique un coup de façon atomique : mutate(state) modifie l'état et retourne
+        True pour l'enregistrer. Retourne l'état obtenu (None si partie inconnue ou expirée)
+
+        Contrairement à load_state + save_state, deux coups simultanés sur la même
+        partie (threads ou workers gunicorn) ne peuvent pas s'écraser.
+        """
+        if not game_id:
+            return None
+        states = []
+
+        def apply(record):
+            state = self._state(record)
+            states.append(state)
+            return self._state_fields(state) if mutate(state) else None
+
+        if self.backend.modify(game_id, time.time(), self.ttl, apply) is None:
+            return None
+        return states[0]
+
+    def delete(self, game_id: str):
+        self.backend.delete(game_id)
+
+    def evict(self) -> int:
+        return self.backend.evict(time.time(), self.max_games)
+
+    def __contains__(self, game_id: str) -> bool:
+        return self.get(game_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+
+def create_store_from_env() -> GameStore:
+    """Construit le store selon SUDOKU_STORE (memory|sqlite), SUDOKU_STORE_PATH,
+    SUDOKU_GAME_TTL et SUDOKU_MAX_GAMES"""
+    kind = os.environ.get('SUDOKU_STORE', 'memory')
+    ttl = float(os.environ.get('SUDOKU_GAME_TTL', DEFAULT_TTL))
+    max_games = int(os.environ.get('SUDOKU_MAX_GAMES', DEFAULT_MAX_GAMES))
+
+    if kind == 'sqlite':
+        default_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sudoku_games.db')
+        backend = SQLiteBackend(os.environ.get('SUDOKU_STORE_PATH', default_path))
+    else:
+        backend = MemoryBackend()
+
+    return GameStore(backend, ttl=ttl, max_games=max_games)
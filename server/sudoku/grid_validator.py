@@ -0,0 +1,90 @@
+"""
+Validation vectorisée de grilles Sudoku avec NumPy
+N grilles empilées en (N, 9, 9) : lignes, colonnes et carrés vérifiés en une passe
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+DIGITS = np.arange(1, 10, dtype=np.uint8)
+
+
+def to_array(grids) -> np.ndarray:
+    """Liste de grilles 9x9 -> tableau (N, 9, 9) uint8, ValueError si le format est invalide
+
+    Seuls les entiers sont acceptés (comme is_grid) : sans dtype imposé, NumPy
+    donne un dtype flottant, chaîne, booléen ou objet (entiers hors int64) aux
+    autres valeurs, rejetées au lieu d'être tronquées ou converties.
+    """
+    try:
+        arr = np.asarray(grids)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('Invalid grid format')
+    if arr.size and arr.dtype.kind not in 'iu':
+        raise ValueError('Grid values must be integers')
+    if arr.ndim == 2:
+        arr = arr[None]
+    if arr.ndim != 3 or arr.shape[1:] != (9, 9):
+        raise ValueError('Invalid grid format')
+    if arr.size and (arr.min() < 0 or arr.max() > 9):
+        raise ValueError('Grid values must be between 0 and 9')
+    return arr.astype(np.uint8)
+
+
+def find_conflicts(grids: np.ndarray, puzzles: Optional[np.ndarray] = None) -> np.ndarray:
+    """Masque (N, 9, 9) des cases en conflit
+
+    Une case est en conflit si son chiffre apparaît plusieurs fois dans sa ligne,
+    sa colonne ou son carré, ou si elle ne respecte pas un indice du puzzle.
+    """
+    n = grids.shape[0]
+    # one-hot (N, 9, 9, 9) : [grille, ligne, colonne, chiffre]
+    onehot = grids[..., None] == DIGITS
+
+    row_dup = onehot.sum(axis=2, dtype=np.uint8) > 1
+    col_dup = onehot.sum(axis=1, dtype=np.uint8) > 1
+    box_dup = onehot.reshape(n, 3, 3, 3, 3, 9).sum(axis=(2, 4), dtype=np.uint8) > 1
+
+    dup = (
+        row_dup[:, :, None, :]
+        | col_dup[:, None, :, :]
+        | np.repeat(np.repeat(box_dup, 3, axis=1), 3, axis=2)
+    )
+    conflicts = (onehot & dup).any(axis=-1)
+
+    if puzzles is not None:
+        conflicts |= (puzzles != 0) & (grids != puzzles)
+
+    return conflicts
+
+
+def check_grids(solutions, puzzles=None) -> List[dict]:
+    """Vérifie N solutions d'un coup, retourne un verdict par grille
+
+    correct : grille complète, sans conflit et fidèle aux indices du puzzle
+    conflicts : positions [ligne, colonne] des cases fautives
+    """
+    grids = to_array(solutions)
+    givens = to_array(puzzles) if puzzles is not None else None
+    if givens is not None and givens.shape != grids.shape:
+        raise ValueError('Puzzles and solutions must have the same length')
+
+    conflicts = find_conflicts(grids, givens)
+    complete = (grids != 0).all(axis=(1, 2))
+    has_conflict = conflicts.any(axis=(1, 2))
+    correct = complete & ~has_conflict
+
+    positions = np.argwhere(conflicts)
+    per_grid = [[] for _ in range(grids.shape[0])]
+    for g, r, c in positions.tolist():
+        per_grid[g].append([r, c])
+
+    return [
+        {
+            'correct': bool(correct[i]),
+            'complete': bool(complete[i]),
+            'conflicts': per_grid[i]
+        }
+        for i in range(grids.shape[0])
+    ]
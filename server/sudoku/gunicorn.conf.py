@@ -0,0 +1,28 @@
+"""
+Configuration gunicorn de l'API Sudoku
+Variables : SUDOKU_BIND, SUDOKU_WORKERS, SUDOKU_THREADS, SUDOKU_BATCH_WORKERS
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('SUDOKU_BIND', '0.0.0.0:8004')
+
+# Génération/résolution sont liées au CPU : un processus par cœur
+workers = int(os.environ.get('SUDOKU_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('SUDOKU_THREADS', 2))
+
+# Chaque worker crée son propre pool de résolution par lots (batch_solver) :
+# partager les cœurs entre workers au lieu d'ouvrir cpu_count processus dans chacun
+os.environ.setdefault('SUDOKU_BATCH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Pas de preload : le thread de remplissage des puzzles doit démarrer
+# dans chaque worker, pas dans le maître avant le fork
+preload_app = False
+
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
+max_requests = 10000
+max_requests_jitter = 1000
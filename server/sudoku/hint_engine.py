@@ -0,0 +1,155 @@
+"""
+Indices logiques pour le Sudoku
+Prochaine déduction la plus simple sur la grille du joueur, erreurs signalées,
+état du solveur mis en cache par partie pour des indices incrémentaux
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from sudoku_grader import TECHNIQUE_WEIGHTS, CandidateState, next_step
+
+# Nombre maximal d'éliminations enchaînées avant d'abandonner la recherche logique
+MAX_CHAIN = 200
+
+
+def find_mistakes(current: List[List[int]], solution: List[List[int]]) -> List[List[int]]:
+    """Cases remplies qui contredisent la solution"""
+    return [
+        [r, c]
+        for r in range(9) for c in range(9)
+        if current[r][c] and current[r][c] != solution[r][c]
+    ]
+
+
+def _clean_cells(current: List[List[int]], solution: List[List[int]]) -> List[int]:
+    """Grille à plat sans les erreurs du joueur (l'analyse ne part que de faits justes)"""
+    return [
+        current[r][c] if current[r][c] == solution[r][c] else 0
+        for r in range(9) for c in range(9)
+    ]
+
+
+def _state_from_cells(cells: List[int]) -> Optional[CandidateState]:
+    return CandidateState.from_grid([cells[r * 9:r * 9 + 9] for r in range(9)])
+
+
+def _advance(state: CandidateState, solution: List[List[int]]) -> dict:
+    """Applique les éliminations jusqu'au premier placement logique
+
+    Les éliminations sont conservées dans l'état : l'indice suivant repart de là.
+    """
+    chain = []
+    for _ in range(MAX_CHAIN):
+        step = next_step(state)
+        if step is None:
+            break
+        if step.placements:
+            chain.append(step)
+            idx, value = step.placements[0]
+            hardest = max(chain, key=lambda s: TECHNIQUE_WEIGHTS[s.technique])
+            return {
+                'row': idx // 9,
+                'col': idx % 9,
+                'value': value,
+                'technique': hardest.technique,
+                'steps': [_describe(s) for s in chain]
+            }
+        state.apply(step)
+        chain.append(step)
+
+    # Aucune déduction logique : on révèle la case la plus contrainte
+    empty = [i for i in range(81) if not state.cells[i]]
+    if not empty:
+        return None
+    idx = min(empty, key=lambda i: bin(state.cands[i]).count('1'))
+    return {
+        'row': idx // 9,
+        'col': idx % 9,
+        'value': solution[idx // 9][idx % 9],
+        'technique': 'backtracking',
+        'steps': [_describe(s) for s in chain]
+    }
+
+
+def _describe(step) -> dict:
+    return {
+        'technique': step.technique,
+        'cells': [[i // 9, i % 9] for i in step.cells],
+        'digits': step.digits,
+        'placements': [[i // 9, i % 9, d] for i, d in step.placements],
+        'eliminations': [[i // 9, i % 9, d] for i, d in step.eliminations]
+    }
+
+
+def find_hint(current: List[List[int]], solution: List[List[int]]) -> dict:
+    """Indice sans cache : erreurs du joueur + prochaine déduction"""
+    cells = _clean_cells(current, solution)
+    state = _state_from_cells(cells)
+    return {
+        'mistakes': find_mistakes(current, solution),
+        'hint': _advance(state, solution) if state is not None else None
+    }
+
+
+class HintEngine:
+    """Indices avec état de candidats mis en cache par partie (LRU)
+
+    Tant que le joueur ne fait qu'ajouter des chiffres justes, l'état en cache
+    (éliminations comprises) est complété au lieu d'être recalculé.
+    """
+
+    def __init__(self, max_games: int = 1000):
+        self.max_games = max_games
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached_state(self, game_id: str, cells: List[int]) -> Optional[CandidateState]:
+        with self._lock:
+            cached = self._cache.get(game_id)
+            if cached is not None:
+                self._cache.move_to_end(game_id)
+
+        if cached is not None:
+            base = cached.cells
+            if all(not base[i] or base[i] == cells[i] for i in range(81)):
+                state = cached.copy()
+                for i in range(81):
+                    if cells[i] and not base[i]:
+                        state.place(i, cells[i])
+                if not state.is_broken():
+                    self.hits += 1
+                    return state
+
+        self.misses += 1
+        return _state_from_cells(cells)
+
+    def _store(self, game_id: str, state: CandidateState):
+        with self._lock:
+            self._cache[game_id] = state
+            self._cache.move_to_end(game_id)
+            while len(self._cache) > self.max_games:
+                self._cache.popitem(last=False)
+
+    def hint(self, game_id: str, current: List[List[int]], solution: List[List[int]]) -> dict:
+        cells = _clean_cells(current, solution)
+        state = self._cached_state(game_id, cells)
+        if state is None:
+            return {'mistakes': find_mistakes(current, solution), 'hint': None}
+
+        hint = _advance(state, solution)
+        self._store(game_id, state)
+        return {
+            'mistakes': find_mistakes(current, solution),
+            'hint': hint
+        }
+
+    def forget(self, game_id: str):
+        with self._lock:
+            self._cache.pop(game_id, None)
+
+    def stats(self) -> dict:
+        return {'cached_games': len(self._cache), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,132 @@
+"""
+Réserve de puzzles Sudoku pré-générés par difficulté
+Un thread de fond maintient chaque file entre deux seuils (bas/haut)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from sudoku_game import SudokuGame
+
+DIFFICULTIES = ('easy', 'medium', 'hard', 'expert')
+
+
+class PuzzlePool:
+    """Files de puzzles prêts à servir, remplies en arrière-plan"""
+
+    def __init__(self, low_watermark: int = 8, high_watermark: int = 32,
+                 difficulties=DIFFICULTIES, rate_window: float = 60.0, cycle_budget: int = 64):
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        # Générations maximum par niveau et par cycle de remplissage : un niveau rare
+        # ('hard') ne monopolise pas le thread (et le GIL) jusqu'au seuil haut
+        self.cycle_budget = cycle_budget
+        self.rate_window = rate_window
+        # deque.append / popleft sont atomiques : pas de verrou sur le chemin de requête
+        self.queues: Dict[str, deque] = {d: deque() for d in difficulties}
+        self.served = 0
+        self.misses = 0
+        self._generated_at: deque = deque(maxlen=1024)
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Instance propre au thread : SudokuGame garde des compteurs internes
+        self._worker_game = SudokuGame()
+
+    def _entry(self, game: SudokuGame, puzzle, solution, grade: dict) -> dict:
+        return {
+            'puzzle': puzzle,
+            'solution': solution,
+            'difficulty': grade['level'],
+            'grade': grade,
+            'solver_calls': game.last_solver_calls
+        }
+
+    def get(self, difficulty: str) -> dict:
+        """Retire un puzzle de la réserve en O(1), génère à la volée si elle est vide
+
+        À la volée : une seule découpe ciblée, sur une instance propre à l'appel (pas de
+        verrou : des requêtes simultanées ne s'attendent pas). Son niveau réel peut
+        différer de celui demandé.
+        """
+        queue = self.queues[difficulty]
+        try:
+            entry = queue.popleft()
+        except IndexError:
+            entry = None
+
+        if len(queue) < self.low_watermark:
+            self._wakeup.set()
+
+        self.served += 1
+        if entry is not None:
+            return entry
+
+        self.misses += 1
+        game = SudokuGame()
+        return self._entry(game, *game.generate_targeted_puzzle(difficulty))
+
+    def start(self):
+        """Démarre le thread de remplissage (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='puzzle-pool', daemon=True)
+        self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Remplir jusqu'au seuil haut, en servant d'abord la file la plus vide, dans
+            # la limite de cycle_budget générations par niveau (le cycle suivant est
+            # déclenché par get() sous le seuil bas, ou tout de suite si une file y
+            # est encore). Chaque puzzle est rangé dans la file de son niveau réel :
+            # un puzzle qui rate sa cible sert une autre file.
+            game = self._worker_game
+            spent = dict.fromkeys(self.queues, 0)
+            while not self._stop.is_set():
+                pending = [d for d, q in self.queues.items()
+                           if len(q) < self.high_watermark and spent[d] < self.cycle_budget]
+                if not pending:
+                    break
+                difficulty = min(pending, key=lambda d: len(self.queues[d]))
+                spent[difficulty] += 1
+                puzzle, solution, grade = game.generate_targeted_puzzle(difficulty)
+                self._generated_at.append(time.monotonic())
+                queue = self.queues.get(grade['level'])
+                if queue is not None and len(queue) < self.high_watermark:
+                    queue.append(self._entry(game, puzzle, solution, grade))
+
+            # Budget épuisé avec une file sous le seuil bas ('hard' est rare) : nouveau cycle
+            if any(len(q) < self.low_watermark for q in self.queues.values()):
+                self._wakeup.set()
+
+    def refill_rate(self) -> float:
+        """Puzzles générés par seconde sur la fenêtre glissante"""
+        now = time.monotonic()
+        recent = [t for t in list(self._generated_at) if now - t <= self.rate_window]
+        if not recent:
+            return 0.0
+        return len(recent) / self.rate_window
+
+    def stats(self) -> dict:
+        return {
+            'depth': {d: len(q) for d, q in self.queues.items()},
+            'low_watermark': self.low_watermark,
+            'high_watermark': self.high_watermark,
+            'refill_rate_per_s': round(self.refill_rate(), 3),
+            'served': self.served,
+            'misses': self.misses,
+            'running': self._thread is not None and self._thread.is_alive()
+        }
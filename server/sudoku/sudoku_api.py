@@ -3,19 +3,43 @@ API Flask pour le jeu Sudoku
 Connecte le jeu Python au frontend React
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from sudoku_game import SudokuGame
+from puzzle_pool import PuzzlePool
+from game_store import create_store_from_env
+from batch_solver import DEFAULT_TIMEOUT, BatchSolver, is_grid, parse_timeout
+from grid_validator import check_grids
+from hint_engine import HintEngine
 import json
+import os
+import sys
+
+# Instrumentation partagée entre les APIs Python (server/instrumentation.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from instrumentation import Metrics, instrument_flask
 
 app = Flask(__name__)
 CORS(app)  # Permettre les requêtes depuis le frontend
 
-# Stocker les parties en cours (en production, utiliser une vraie DB)
-active_games = {}
+metrics = Metrics('sudoku')
+instrument_flask(app, metrics)
+
+# Pool de processus pour /solve-batch (créé à la première requête)
+batch_solver = BatchSolver(max_workers=int(os.environ.get('SUDOKU_BATCH_WORKERS', 0)) or None)
+
+# Parties en cours : expiration + LRU, backend mémoire ou SQLite (SUDOKU_STORE)
+game_store = create_store_from_env()
 
 sudoku = SudokuGame()
 
+# Indices logiques, état du solveur mis en cache par partie
+hint_engine = HintEngine()
+
+# Réserve de puzzles pré-générés, remplie en arrière-plan
+puzzle_pool = PuzzlePool()
+puzzle_pool.start()
+
 
 @app.route('/api/sudoku/generate', methods=['POST'])
 def generate_puzzle():
@@ -26,23 +50,25 @@ def generate_puzzle():
     if difficulty not in ['easy', 'medium', 'hard', 'expert']:
         return jsonify({'error': 'Invalid difficulty'}), 400
     
-    puzzle, solution = sudoku.generate_puzzle(difficulty)
+    with metrics.stage('generate'):
+        entry = puzzle_pool.get(difficulty)
+    puzzle, solution = entry['puzzle'], entry['solution']
     
     # Générer un ID unique pour cette partie
     import uuid
     game_id = str(uuid.uuid4())
     
     # Stocker la solution
-    active_games[game_id] = {
-        'puzzle': puzzle,
-        'solution': solution,
-        'difficulty': difficulty
-    }
+    # Niveau réellement obtenu (évalué), qui peut différer du niveau demandé
+    game_store.save(game_id, puzzle, solution, entry['difficulty'])
     
     return jsonify({
         'gameId': game_id,
         'puzzle': puzzle,
-        'difficulty': difficulty,
+        'difficulty': entry['difficulty'],
+        'requestedDifficulty': difficulty,
+        'grade': entry['grade'],
+        'solverCalls': entry['solver_calls'],
         'success': True
     })
 
@@ -60,7 +86,10 @@ def solve_puzzle():
     grid_copy = [row[:] for row in grid]
     
     game = SudokuGame()
-    if game.solve(grid_copy):
+    with metrics.stage('solve'):
+        solved = game.solve(grid_copy)
+    
+    if solved:
         return jsonify({
             'solution': grid_copy,
             'success': True
@@ -72,6 +101,48 @@ def solve_puzzle():
         }), 400
 
 
+@app.route('/api/sudoku/solve-batch', methods=['POST'])
+def solve_batch():
+    """Résout un lot de grilles et renvoie les résultats en NDJSON au fil de l'eau
+
+    Corps JSON {"grids": [...], "timeout": 5} ou flux NDJSON (une grille par ligne,
+    timeout en paramètre de requête). Le timeout par grille est borné à MAX_TIMEOUT. Chaque ligne de réponse porte l'index de la
+    grille, son statut (solved, unsolvable, invalid, timeout, error) et la solution.
+    """
+    try:
+        timeout = parse_timeout(request.args.get('timeout', DEFAULT_TIMEOUT))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if request.mimetype == 'application/x-ndjson':
+        def read_grids():
+            for line in request.stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    item = None
+                yield item.get('grid') if isinstance(item, dict) else item
+        grids = read_grids()
+    else:
+        data = request.get_json(silent=True) or {}
+        grids = data.get('grids')
+        try:
+            timeout = parse_timeout(data.get('timeout', timeout))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not isinstance(grids, list):
+            return jsonify({'error': 'Expected a "grids" list'}), 400
+    
+    def generate():
+        for result in batch_solver.solve_iter(grids, timeout=timeout):
+            yield json.dumps(result) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/sudoku/check', methods=['POST'])
 def check_solution():
     """Vérifie si une solution est correcte"""
@@ -79,69 +150,136 @@ def check_solution():
     game_id = data.get('gameId')
     user_solution = data.get('solution')
     
-    if game_id not in active_games:
+    game_data = game_store.get(game_id)
+    if game_data is None:
         return jsonify({'error': 'Game not found'}), 404
     
-    game_data = active_games[game_id]
     puzzle = game_data['puzzle']
     
-    game = SudokuGame()
-    is_correct = game.check_solution(puzzle, user_solution)
+    try:
+        with metrics.stage('check'):
+            verdict = check_grids([user_solution], [puzzle])[0]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'correct': is_correct,
+        'correct': verdict['correct'],
+        'complete': verdict['complete'],
+        'conflicts': verdict['conflicts'],
+        'success': True
+    })
+
+
+@app.route('/api/sudoku/check-batch', methods=['POST'])
+def check_batch():
+    """Vérifie un lot de solutions en une passe (rejeu de journaux de score)
+
+    Corps JSON {"solutions": [...], "puzzles": [...]} ; "puzzles" est optionnel et,
+    s'il est fourni, les indices de chaque puzzle doivent être respectés.
+    """
+    data = request.get_json(silent=True) or {}
+    solutions = data.get('solutions')
+    puzzles = data.get('puzzles')
+    
+    if not isinstance(solutions, list) or not solutions:
+        return jsonify({'error': 'Expected a non-empty "solutions" list'}), 400
+    
+    try:
+        results = check_grids(solutions, puzzles)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'results': results,
+        'correct_count': sum(r['correct'] for r in results),
         'success': True
     })
 
 
 @app.route('/api/sudoku/hint', methods=['POST'])
 def get_hint():
-    """Retourne un indice pour le joueur"""
-    data = request.get_json()
+    """Retourne la prochaine déduction logique et signale les erreurs du joueur
+
+    currentGrid est optionnel : à défaut, la grille suivie côté serveur est utilisée.
+    """
+    data = request.get_json(silent=True) or {}
     game_id = data.get('gameId')
     current_grid = data.get('currentGrid')
     
-    if game_id not in active_games:
+    game_data = game_store.get(game_id)
+    if game_data is None:
         return jsonify({'error': 'Game not found'}), 404
     
-    game_data = active_games[game_id]
-    puzzle = game_data['puzzle']
-    solution = game_data['solution']
+    if current_grid is None:
+        current_grid = game_data['current']
+    elif not is_grid(current_grid):
+        return jsonify({'error': 'Invalid grid format'}), 400
     
-    game = SudokuGame()
-    hint = game.get_hint(puzzle, current_grid, solution)
+    with metrics.stage('hint'):
+        result = hint_engine.hint(game_id, current_grid, game_data['solution'])
+    hint = result['hint']
     
     if hint:
-        row, col, value = hint
         return jsonify({
-            'hint': {
-                'row': row,
-                'col': col,
-                'value': value
-            },
+            'hint': hint,
+            'mistakes': result['mistakes'],
             'success': True
         })
     else:
         return jsonify({
             'message': 'Grille complète!',
+            'mistakes': result['mistakes'],
             'success': True
         })
 
 
 @app.route('/api/sudoku/validate-move', methods=['POST'])
 def validate_move():
-    """Valide si un coup est légal"""
-    data = request.get_json()
-    grid = data.get('grid')
+    """Valide et joue un coup sur l'état serveur de la partie
+
+    Corps {gameId, row, col, value} (value = 0 pour effacer). Répond en temps
+    constant avec les cases en conflit et les candidats restants de la case.
+    Sans gameId, l'ancien format {grid, row, col, value} reste accepté.
+    """
+    data = request.get_json(silent=True) or {}
+    game_id = data.get('gameId')
     row = data.get('row')
     col = data.get('col')
     value = data.get('value')
     
-    game = SudokuGame()
-    is_valid = game.is_valid(grid, row, col, value)
+    if not all(isinstance(v, int) for v in (row, col, value)) \
+            or not (0 <= row < 9 and 0 <= col < 9 and 0 <= value <= 9):
+        return jsonify({'error': 'Invalid move'}), 400
+    
+    if game_id is None and 'grid' in data:
+        game = SudokuGame()
+        is_valid = game.is_valid(data['grid'], row, col, value)
+        return jsonify({
+            'valid': is_valid,
+            'success': True
+        })
     
+    idx = row * 9 + col
+    
+    def play(state):
+        if state.is_given(idx):
+            return False
+        state.set(idx, value)
+        return True
+    
+    # Lecture + coup + écriture atomiques : deux coups simultanés ne s'écrasent pas
+    state = game_store.modify_state(game_id, play)
+    if state is None:
+        return jsonify({'error': 'Game not found'}), 404
+    if state.is_given(idx):
+        return jsonify({'error': 'Cannot modify a given cell'}), 400
+    
+    conflicts = state.conflicts(idx)
     return jsonify({
-        'valid': is_valid,
+        'valid': not conflicts,
+        'conflicts': [[p // 9, p % 9] for p in conflicts],
+        'candidates': state.candidates(idx),
+        'complete': state.is_complete(),
         'success': True
     })
 
@@ -152,7 +290,9 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'message': 'Sudoku API is running',
-        'active_games': len(active_games)
+        'active_games': len(game_store),
+        'puzzle_pool': puzzle_pool.stats(),
+        'hint_cache': hint_engine.stats()
     })
 
 
@@ -161,9 +301,14 @@ if __name__ == '__main__':
     print(" Endpoints disponibles:")
     print("  POST /api/sudoku/generate - Générer une grille")
     print("  POST /api/sudoku/solve - Résoudre une grille")
+    print("  POST /api/sudoku/solve-batch - Résoudre un lot de grilles (NDJSON)")
     print("  POST /api/sudoku/check - Vérifier une solution")
+    print("  POST /api/sudoku/check-batch - Vérifier un lot de solutions")
     print("  POST /api/sudoku/hint - Obtenir un indice")
     print("  POST /api/sudoku/validate-move - Valider un coup")
     print("  GET  /api/sudoku/health - Health check")
+    print("  GET  /metrics - Métriques Prometheus")
+    
+    print(" Production (plusieurs workers) : gunicorn -c gunicorn.conf.py wsgi:app")
     
     app.run(debug=True, port=8004, host='0.0.0.0')
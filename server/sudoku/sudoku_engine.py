@@ -0,0 +1,239 @@
+"""
+Moteur de résolution Sudoku par masques de bits
+Propagation de contraintes (singletons nus et cachés) + backtracking MRV
+"""
+
+import random
+import time
+from typing import List, Optional
+
+# Un chiffre d (1..9) est représenté par le bit (1 << (d - 1))
+FULL = 0x1FF
+
+ROW_OF = [i // 9 for i in range(81)]
+COL_OF = [i % 9 for i in range(81)]
+BOX_OF = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+
+# Les 27 unités (9 lignes, 9 colonnes, 9 carrés) en indices de cases
+UNITS = (
+    [[r * 9 + c for c in range(9)] for r in range(9)]
+    + [[r * 9 + c for r in range(9)] for c in range(9)]
+    + [[(b // 3) * 27 + (b % 3) * 3 + (k // 3) * 9 + k % 3 for k in range(9)] for b in range(9)]
+)
+
+# Voisins de chaque case (même ligne, colonne ou carré), sans la case elle-même
+PEERS = [
+    sorted({p for unit in UNITS if i in unit for p in unit} - {i})
+    for i in range(81)
+]
+
+# Tables précalculées pour les 512 masques possibles
+POPCOUNT = [bin(m).count('1') for m in range(512)]
+DIGITS = [[d for d in range(1, 10) if m & (1 << (d - 1))] for m in range(512)]
+BIT = [0] + [1 << (d - 1) for d in range(1, 10)]
+
+
+class SolverTimeout(Exception):
+    """Levée quand la résolution dépasse l'échéance fixée"""
+
+
+class BitmaskState:
+    """État d'une grille : 81 cases + masques des chiffres utilisés par ligne/colonne/carré"""
+
+    __slots__ = ('cells', 'rows', 'cols', 'boxes')
+
+    def __init__(self):
+        self.cells = [0] * 81
+        self.rows = [0] * 9
+        self.cols = [0] * 9
+        self.boxes = [0] * 9
+
+    @classmethod
+    def from_grid(cls, grid: List[List[int]]) -> Optional['BitmaskState']:
+        """Construit l'état depuis une grille 9x9 (None si les indices sont contradictoires)"""
+        state = cls()
+        for r in range(9):
+            row = grid[r]
+            for c in range(9):
+                d = row[c]
+                if not d:
+                    continue
+                if not isinstance(d, int) or d < 1 or d > 9:
+                    return None
+                idx = r * 9 + c
+                if not state.candidates(idx) & BIT[d]:
+                    return None
+                state.place(idx, d)
+        return state
+
+    def candidates(self, idx: int) -> int:
+        """Masque des chiffres encore possibles pour une case"""
+        return ~(self.rows[ROW_OF[idx]] | self.cols[COL_OF[idx]] | self.boxes[BOX_OF[idx]]) & FULL
+
+    def place(self, idx: int, d: int):
+        bit = BIT[d]
+        self.cells[idx] = d
+        self.rows[ROW_OF[idx]] |= bit
+        self.cols[COL_OF[idx]] |= bit
+        self.boxes[BOX_OF[idx]] |= bit
+
+    def remove(self, idx: int):
+        bit = ~BIT[self.cells[idx]]
+        self.cells[idx] = 0
+        self.rows[ROW_OF[idx]] &= bit
+        self.cols[COL_OF[idx]] &= bit
+        self.boxes[BOX_OF[idx]] &= bit
+
+    def to_grid(self) -> List[List[int]]:
+        cells = self.cells
+        return [cells[r * 9:r * 9 + 9] for r in range(9)]
+
+
+class BitmaskSolver:
+    """Solveur par propagation de contraintes et choix de la case la plus contrainte (MRV)"""
+
+    def __init__(self, rng: Optional[random.Random] = None, deadline: Optional[float] = None):
+        # Générateur utilisé pour l'ordre aléatoire des chiffres (génération de grilles)
+        self.rng = rng or random
+        # Échéance time.monotonic() au-delà de laquelle SolverTimeout est levée
+        self.deadline = deadline
+        # Nombre de nœuds explorés depuis la création (coût de résolution)
+        self.calls = 0
+
+    def solve(self, grid: List[List[int]], randomize: bool = False) -> bool:
+        """Résout la grille en place, retourne False si aucune solution"""
+        state = BitmaskState.from_grid(grid)
+        if state is None:
+            return False
+
+        if not self._search(state, randomize):
+            return False
+
+        cells = state.cells
+        for r in range(9):
+            grid[r][:] = cells[r * 9:r * 9 + 9]
+        return True
+
+    def count_solutions(self, grid: List[List[int]], limit: int = 2) -> int:
+        """Compte les solutions de la grille en s'arrêtant à `limit` (ne modifie pas la grille)"""
+        state = BitmaskState.from_grid(grid)
+        if state is None:
+            return 0
+        return self._count(state, limit)
+
+    def _propagate(self, state: BitmaskState, trail: List[int]) -> bool:
+        """Applique singletons nus et cachés jusqu'au point fixe, False si contradiction"""
+        cells = state.cells
+        rows, cols, boxes = state.rows, state.cols, state.boxes
+        changed = True
+
+        while changed:
+            changed = False
+
+            # Singletons nus : une seule valeur possible pour la case
+            for idx in range(81):
+                if cells[idx]:
+                    continue
+                m = ~(rows[ROW_OF[idx]] | cols[COL_OF[idx]] | boxes[BOX_OF[idx]]) & FULL
+                if not m:
+                    return False
+                if not m & (m - 1):
+                    state.place(idx, DIGITS[m][0])
+                    trail.append(idx)
+                    changed = True
+
+            # Singletons cachés : une valeur n'a qu'une seule place dans l'unité
+            for unit in UNITS:
+                once = twice = placed = 0
+                for idx in unit:
+                    d = cells[idx]
+                    if d:
+                        placed |= BIT[d]
+                        continue
+                    m = ~(rows[ROW_OF[idx]] | cols[COL_OF[idx]] | boxes[BOX_OF[idx]]) & FULL
+                    twice |= once & m
+                    once |= m
+
+                if (once | placed) != FULL:
+                    return False
+
+                singles = once & ~twice & ~placed
+                if not singles:
+                    continue
+
+                for idx in unit:
+                    if cells[idx]:
+                        continue
+                    m = state.candidates(idx) & singles
+                    if not m:
+                        continue
+                    if m & (m - 1):
+                        return False
+                    state.place(idx, DIGITS[m][0])
+                    trail.append(idx)
+                    changed = True
+
+        return True
+
+    def _select(self, state: BitmaskState) -> int:
+        """Retourne la case vide avec le moins de candidats (-1 si la grille est pleine)"""
+        cells = state.cells
+        best, best_count = -1, 10
+        for idx in range(81):
+            if cells[idx]:
+                continue
+            n = POPCOUNT[state.candidates(idx)]
+            if n < best_count:
+                best, best_count = idx, n
+                if n <= 2:
+                    break
+        return best
+
+    def _search(self, state: BitmaskState, randomize: bool) -> bool:
+        self.calls += 1
+        if self.deadline is not None and not self.calls & 63 and time.monotonic() > self.deadline:
+            raise SolverTimeout()
+        trail: List[int] = []
+
+        if self._propagate(state, trail):
+            idx = self._select(state)
+            if idx < 0:
+                return True
+
+            digits = DIGITS[state.candidates(idx)]
+            if randomize:
+                digits = digits[:]
+                self.rng.shuffle(digits)
+
+            for d in digits:
+                state.place(idx, d)
+                if self._search(state, randomize):
+                    return True
+                state.remove(idx)
+
+        for idx in reversed(trail):
+            state.remove(idx)
+        return False
+
+    def _count(self, state: BitmaskState, limit: int) -> int:
+        self.calls += 1
+        if self.deadline is not None and not self.calls & 63 and time.monotonic() > self.deadline:
+            raise SolverTimeout()
+        trail: List[int] = []
+        found = 0
+
+        if self._propagate(state, trail):
+            idx = self._select(state)
+            if idx < 0:
+                found = 1
+            else:
+                for d in DIGITS[state.candidates(idx)]:
+                    state.place(idx, d)
+                    found += self._count(state, limit - found)
+                    state.remove(idx)
+                    if found >= limit:
+                        break
+
+        for idx in reversed(trail):
+            state.remove(idx)
+        return found
@@ -6,11 +6,28 @@ Créé pour le portfolio d'Abel Aubron
 import random
 from typing import List, Optional, Tuple
 
+from sudoku_engine import BitmaskSolver
+from sudoku_grader import LEVEL_THRESHOLDS, grade_puzzle
+
+LEVELS = [level for level, _ in LEVEL_THRESHOLDS]
+
+# Nombre de cases à retirer selon la difficulté (minimum avant notation pour carve_to_level)
+CELLS_TO_REMOVE = {
+    'easy': 30,
+    'medium': 40,
+    'hard': 50,
+    'expert': 55
+}
+
 
 class SudokuGame:
     """Classe pour générer, résoudre et gérer des grilles de Sudoku"""
     
-    def __init__(self):
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random
+        # Nombre total de nœuds explorés par le solveur (coût de génération/résolution)
+        self.solver_calls = 0
+        self.last_solver_calls = 0
         self.grid: List[List[int]] = [[0 for _ in range(9)] for _ in range(9)]
         self.solution: List[List[int]] = [[0 for _ in range(9)] for _ in range(9)]
     
@@ -33,26 +50,26 @@ class SudokuGame:
         
         return True
     
-    def solve(self, grid: List[List[int]]) -> bool:
-        """Résout une grille de Sudoku avec backtracking"""
-        for row in range(9):
-            for col in range(9):
-                if grid[row][col] == 0:
-                    # Essayer les chiffres de 1 à 9 dans un ordre aléatoire pour plus de variété
-                    numbers = list(range(1, 10))
-                    random.shuffle(numbers)
-                    
-                    for num in numbers:
-                        if self.is_valid(grid, row, col, num):
-                            grid[row][col] = num
-                            
-                            if self.solve(grid):
-                                return True
-                            
-                            grid[row][col] = 0
-                    
-                    return False
-        return True
+    def solve(self, grid: List[List[int]], randomize: bool = False) -> bool:
+        """Résout une grille de Sudoku en place (masques de bits + propagation + MRV)
+
+        randomize=True mélange l'ordre des chiffres essayés (variété pour la génération)
+        """
+        solver = BitmaskSolver(self.rng)
+        solved = solver.solve(grid, randomize=randomize)
+        self.solver_calls += solver.calls
+        return solved
+    
+    def count_solutions(self, grid: List[List[int]], limit: int = 2) -> int:
+        """Compte les solutions d'une grille, en s'arrêtant dès `limit` solutions trouvées"""
+        solver = BitmaskSolver(self.rng)
+        count = solver.count_solutions(grid, limit)
+        self.solver_calls += solver.calls
+        return count
+    
+    def has_unique_solution(self, grid: List[List[int]]) -> bool:
+        """Vérifie que la grille admet exactement une solution"""
+        return self.count_solutions(grid, limit=2) == 1
     
     def generate_complete_grid(self) -> List[List[int]]:
         """Génère une grille complète et valide"""
@@ -61,7 +78,7 @@ class SudokuGame:
         # Remplir la diagonale (3 carrés 3x3 indépendants)
         for box in range(0, 9, 3):
             nums = list(range(1, 10))
-            random.shuffle(nums)
+            self.rng.shuffle(nums)
             idx = 0
             for i in range(box, box + 3):
                 for j in range(box, box + 3):
@@ -69,24 +86,20 @@ class SudokuGame:
                     idx += 1
         
         # Résoudre le reste
-        self.solve(grid)
+        self.solve(grid, randomize=True)
         return grid
     
     def remove_numbers(self, grid: List[List[int]], difficulty: str = 'medium') -> List[List[int]]:
-        """Retire des nombres pour créer le puzzle"""
-        # Nombre de cases à retirer selon la difficulté
-        cells_to_remove = {
-            'easy': 30,
-            'medium': 40,
-            'hard': 50,
-            'expert': 55
-        }
-        
-        num_to_remove = cells_to_remove.get(difficulty, 40)
+        """Retire des nombres pour créer le puzzle, en garantissant une solution unique
+
+        Une case n'est vidée que si la grille reste à solution unique ; si la
+        cible n'est pas atteignable (puzzle minimal), on s'arrête avant.
+        """
+        num_to_remove = CELLS_TO_REMOVE.get(difficulty, 40)
         puzzle = [row[:] for row in grid]  # Copie profonde
         
         positions = [(i, j) for i in range(9) for j in range(9)]
-        random.shuffle(positions)
+        self.rng.shuffle(positions)
         
         removed = 0
         for row, col in positions:
@@ -96,49 +109,135 @@ class SudokuGame:
             backup = puzzle[row][col]
             puzzle[row][col] = 0
             
-            # Vérifier si la grille a toujours une solution unique
-            # (simplification: on suppose que oui pour la performance)
+            # Tant qu'on retire peu de cases, les singletons suffisent et le
+            # comptage s'arrête à la première propagation : le coût reste faible
+            if not self.has_unique_solution(puzzle):
+                puzzle[row][col] = backup
+                continue
+            
             removed += 1
         
         return puzzle
     
+    def carve_to_level(self, grid: List[List[int]], level: str) -> Tuple[List[List[int]], dict]:
+        """Retire des nombres en visant le niveau évalué `level` -> (puzzle, note)
+
+        Comme remove_numbers, mais à partir de CELLS_TO_REMOVE[level] cases retirées la
+        grille est notée après chaque retrait. Si elle dépasse déjà le niveau visé à la
+        première note, les derniers retraits sont remis un à un jusqu'à revenir au
+        niveau visé ou en dessous ; ensuite, un retrait qui dépasse le niveau est
+        annulé. La découpe s'arrête dès que le niveau est atteint ; si la grille devient
+        minimale avant, elle est retournée avec son niveau réel (plus facile).
+        """
+        target = LEVELS.index(level)
+        minimum = CELLS_TO_REMOVE[level]
+        puzzle = [row[:] for row in grid]
+        grade = None
+        removed = []
+        
+        positions = [(i, j) for i in range(9) for j in range(9)]
+        self.rng.shuffle(positions)
+        
+        for row, col in positions:
+            backup = puzzle[row][col]
+            puzzle[row][col] = 0
+            if not self.has_unique_solution(puzzle):
+                puzzle[row][col] = backup
+                continue
+            
+            removed.append((row, col, backup))
+            if len(removed) < minimum:
+                continue
+            
+            candidate = self.grade_puzzle(puzzle)
+            reached = LEVELS.index(candidate['level'])
+            if reached > target and grade is None:
+                # Déjà trop difficile au minimum : remettre des nombres (la solution
+                # reste unique) jusqu'à repasser au niveau visé ou en dessous
+                while reached > target and removed:
+                    r, c, value = removed.pop()
+                    puzzle[r][c] = value
+                    candidate = self.grade_puzzle(puzzle)
+                    reached = LEVELS.index(candidate['level'])
+            elif reached > target:
+                removed.pop()
+                puzzle[row][col] = backup
+                continue
+            
+            grade = candidate
+            if reached == target:
+                break
+        
+        if grade is None:
+            grade = self.grade_puzzle(puzzle)
+        return puzzle, grade
+    
+    def generate_targeted_puzzle(self, level: str) -> Tuple[List[List[int]], List[List[int]], dict]:
+        """Génère un puzzle découpé vers le niveau `level` -> (puzzle, solution, note)
+
+        Le niveau réel (note['level']) peut rester plus facile que visé ; le nombre
+        d'appels au solveur est disponible dans self.last_solver_calls
+        """
+        calls_before = self.solver_calls
+        solution = self.generate_complete_grid()
+        puzzle, grade = self.carve_to_level(solution, level)
+        self.last_solver_calls = self.solver_calls - calls_before
+        return puzzle, solution, grade
+    
     def generate_puzzle(self, difficulty: str = 'medium') -> Tuple[List[List[int]], List[List[int]]]:
-        """Génère un puzzle Sudoku avec sa solution"""
+        """Génère un puzzle Sudoku à solution unique avec sa solution
+
+        Le nombre d'appels au solveur est disponible dans self.last_solver_calls
+        """
+        calls_before = self.solver_calls
         solution = self.generate_complete_grid()
         puzzle = self.remove_numbers(solution, difficulty)
+        self.last_solver_calls = self.solver_calls - calls_before
         return puzzle, solution
     
-    def check_solution(self, puzzle: List[List[int]], user_solution: List[List[int]]) -> bool:
-        """Vérifie si la solution proposée est correcte"""
-        # Vérifier que toutes les cases sont remplies
-        for row in user_solution:
-            if 0 in row:
-                return False
-        
-        # Vérifier toutes les règles du Sudoku
-        for i in range(9):
-            for j in range(9):
-                num = user_solution[i][j]
-                user_solution[i][j] = 0  # Temporairement vide pour vérifier
-                
-                if not self.is_valid(user_solution, i, j, num):
-                    user_solution[i][j] = num
-                    return False
-                
-                user_solution[i][j] = num
+    def grade_puzzle(self, puzzle: List[List[int]]) -> dict:
+        """Note la difficulté réelle d'un puzzle (technique la plus dure nécessaire)"""
+        return grade_puzzle(puzzle)
+    
+    def generate_graded_puzzle(self, difficulty: str = 'medium', max_attempts: int = 10) -> Tuple[List[List[int]], List[List[int]], dict]:
+        """Génère un puzzle dont le niveau évalué correspond à la difficulté demandée
+
+        Après max_attempts essais, retourne le puzzle dont le niveau est le plus proche.
+        """
+        if difficulty not in LEVELS:
+            difficulty = 'medium'
+        target = LEVELS.index(difficulty)
+        best = None
+        best_distance = len(LEVELS)
         
-        return True
+        for _ in range(max_attempts):
+            puzzle, solution, grade = self.generate_targeted_puzzle(difficulty)
+            distance = abs(LEVELS.index(grade['level']) - target)
+            if distance < best_distance:
+                best, best_distance = (puzzle, solution, grade), distance
+            if distance == 0:
+                break
+        
+        return best
+    
+    def check_solution(self, puzzle: Optional[List[List[int]]], user_solution: List[List[int]]) -> bool:
+        """Vérifie si la solution proposée est correcte (complète, sans conflit, indices respectés)"""
+        from grid_validator import check_grids
+        
+        try:
+            return check_grids([user_solution], [puzzle] if puzzle is not None else None)[0]['correct']
+        except ValueError:
+            return False
     
     def get_hint(self, puzzle: List[List[int]], current: List[List[int]], solution: List[List[int]]) -> Optional[Tuple[int, int, int]]:
-        """Retourne un indice (ligne, colonne, valeur)"""
-        empty_cells = [(i, j) for i in range(9) for j in range(9) if current[i][j] == 0]
+        """Retourne un indice (ligne, colonne, valeur) : la prochaine déduction logique la plus simple"""
+        from hint_engine import find_hint
         
-        if not empty_cells:
+        hint = find_hint(current, solution)['hint']
+        if hint is None:
             return None
         
-        row, col = random.choice(empty_cells)
-        return (row, col, solution[row][col])
-
+        return (hint['row'], hint['col'], hint['value'])
 
 def print_grid(grid: List[List[int]]):
     """Affiche une grille de Sudoku de manière lisible"""
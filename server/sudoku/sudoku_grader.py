@@ -0,0 +1,291 @@
+"""
+Évaluation de la difficulté d'un Sudoku par techniques de résolution humaines
+Singletons, candidats verrouillés, paires, triplets, X-wing sur masques de candidats
+"""
+
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sudoku_engine import BIT, BOX_OF, COL_OF, DIGITS, PEERS, POPCOUNT, ROW_OF, UNITS, BitmaskState
+
+ROW_UNITS = UNITS[0:9]
+COL_UNITS = UNITS[9:18]
+BOX_UNITS = UNITS[18:27]
+
+# Poids de chaque technique (plus élevé = plus difficile)
+TECHNIQUE_WEIGHTS = {
+    'naked_single': 1,
+    'hidden_single': 2,
+    'pointing': 3,
+    'claiming': 3,
+    'naked_pair': 4,
+    'hidden_pair': 5,
+    'naked_triple': 6,
+    'x_wing': 7,
+    'backtracking': 10
+}
+
+# Difficulté maximale (poids de la technique la plus dure) pour chaque niveau
+LEVEL_THRESHOLDS = [
+    ('easy', 2),
+    ('medium', 4),
+    ('hard', 7),
+    ('expert', 10)
+]
+
+
+class Step(NamedTuple):
+    """Une déduction : placements et/ou éliminations, avec les cases qui la justifient"""
+    technique: str
+    placements: List[Tuple[int, int]]
+    eliminations: List[Tuple[int, int]]
+    cells: List[int]
+    digits: List[int]
+
+
+class CandidateState:
+    """Grille + masque de candidats par case, mis à jour à chaque placement/élimination"""
+
+    __slots__ = ('cells', 'cands')
+
+    def __init__(self, cells: List[int], cands: List[int]):
+        self.cells = cells
+        self.cands = cands
+
+    @classmethod
+    def from_grid(cls, grid: List[List[int]]) -> Optional['CandidateState']:
+        state = BitmaskState.from_grid(grid)
+        if state is None:
+            return None
+        cells = state.cells[:]
+        cands = [0 if cells[i] else state.candidates(i) for i in range(81)]
+        return cls(cells, cands)
+
+    def copy(self) -> 'CandidateState':
+        return CandidateState(self.cells[:], self.cands[:])
+
+    def place(self, idx: int, d: int):
+        mask = ~BIT[d]
+        self.cells[idx] = d
+        self.cands[idx] = 0
+        cands = self.cands
+        for p in PEERS[idx]:
+            cands[p] &= mask
+
+    def apply(self, step: Step):
+        for idx, d in step.placements:
+            self.place(idx, d)
+        for idx, d in step.eliminations:
+            self.cands[idx] &= ~BIT[d]
+
+    def is_solved(self) -> bool:
+        return 0 not in self.cells
+
+    def is_broken(self) -> bool:
+        """Une case vide sans candidat : la grille courante est contradictoire"""
+        cells, cands = self.cells, self.cands
+        return any(not cells[i] and not cands[i] for i in range(81))
+
+
+def _positions(state: CandidateState, unit: List[int], bit: int) -> List[int]:
+    cands = state.cands
+    return [i for i in unit if cands[i] & bit]
+
+
+def find_naked_single(state: CandidateState) -> Optional[Step]:
+    cands = state.cands
+    for idx in range(81):
+        m = cands[idx]
+        if m and not m & (m - 1):
+            d = DIGITS[m][0]
+            return Step('naked_single', [(idx, d)], [], [idx], [d])
+    return None
+
+
+def find_hidden_single(state: CandidateState) -> Optional[Step]:
+    cands = state.cands
+    for unit in UNITS:
+        once = twice = 0
+        for idx in unit:
+            m = cands[idx]
+            twice |= once & m
+            once |= m
+        singles = once & ~twice
+        if not singles:
+            continue
+        for idx in unit:
+            m = cands[idx] & singles
+            if m:
+                d = DIGITS[m][0]
+                return Step('hidden_single', [(idx, d)], [], list(unit), [d])
+    return None
+
+
+def find_pointing(state: CandidateState) -> Optional[Step]:
+    """Candidats d'un carré alignés sur une ligne/colonne : éliminés du reste de la ligne/colonne"""
+    cands = state.cands
+    for box in BOX_UNITS:
+        for d in range(1, 10):
+            bit = BIT[d]
+            pos = _positions(state, box, bit)
+            if len(pos) < 2:
+                continue
+            for line_of, lines in ((ROW_OF, ROW_UNITS), (COL_OF, COL_UNITS)):
+                line = line_of[pos[0]]
+                if any(line_of[i] != line for i in pos):
+                    continue
+                elim = [(i, d) for i in lines[line] if cands[i] & bit and i not in pos]
+                if elim:
+                    return Step('pointing', [], elim, pos, [d])
+    return None
+
+
+def find_claiming(state: CandidateState) -> Optional[Step]:
+    """Candidats d'une ligne/colonne dans un seul carré : éliminés du reste du carré"""
+    cands = state.cands
+    for line in ROW_UNITS + COL_UNITS:
+        for d in range(1, 10):
+            bit = BIT[d]
+            pos = _positions(state, line, bit)
+            if len(pos) < 2:
+                continue
+            box = BOX_OF[pos[0]]
+            if any(BOX_OF[i] != box for i in pos):
+                continue
+            elim = [(i, d) for i in BOX_UNITS[box] if cands[i] & bit and i not in pos]
+            if elim:
+                return Step('claiming', [], elim, pos, [d])
+    return None
+
+
+def _find_naked_subset(state: CandidateState, size: int, technique: str) -> Optional[Step]:
+    cands = state.cands
+    for unit in UNITS:
+        pool = [i for i in unit if 2 <= POPCOUNT[cands[i]] <= size]
+        if len(pool) < size:
+            continue
+        for subset in combinations(pool, size):
+            union = 0
+            for i in subset:
+                union |= cands[i]
+            if POPCOUNT[union] != size:
+                continue
+            elim = [(i, d) for i in unit if i not in subset
+                    for d in DIGITS[cands[i] & union]]
+            if elim:
+                return Step(technique, [], elim, list(subset), DIGITS[union])
+    return None
+
+
+def find_naked_pair(state: CandidateState) -> Optional[Step]:
+    return _find_naked_subset(state, 2, 'naked_pair')
+
+
+def find_naked_triple(state: CandidateState) -> Optional[Step]:
+    return _find_naked_subset(state, 3, 'naked_triple')
+
+
+def find_hidden_pair(state: CandidateState) -> Optional[Step]:
+    """Deux chiffres confinés aux deux mêmes cases : les autres candidats de ces cases tombent"""
+    cands = state.cands
+    for unit in UNITS:
+        where: Dict[Tuple[int, ...], List[int]] = {}
+        for d in range(1, 10):
+            pos = _positions(state, unit, BIT[d])
+            if len(pos) == 2:
+                where.setdefault(tuple(pos), []).append(d)
+        for pos, digits in where.items():
+            if len(digits) != 2:
+                continue
+            keep = BIT[digits[0]] | BIT[digits[1]]
+            elim = [(i, d) for i in pos for d in DIGITS[cands[i] & ~keep]]
+            if elim:
+                return Step('hidden_pair', [], elim, list(pos), digits)
+    return None
+
+
+def find_x_wing(state: CandidateState) -> Optional[Step]:
+    """Un chiffre sur exactement deux colonnes dans deux lignes (ou l'inverse)"""
+    cands = state.cands
+    for d in range(1, 10):
+        bit = BIT[d]
+        for base, cover, cover_of in ((ROW_UNITS, COL_UNITS, COL_OF), (COL_UNITS, ROW_UNITS, ROW_OF)):
+            pairs: Dict[Tuple[int, int], List[int]] = {}
+            for line in base:
+                pos = _positions(state, line, bit)
+                if len(pos) == 2:
+                    pairs.setdefault((cover_of[pos[0]], cover_of[pos[1]]), []).extend(pos)
+            for (a, b), pos in pairs.items():
+                if len(pos) != 4:
+                    continue
+                elim = [(i, d) for c in (a, b) for i in cover[c]
+                        if cands[i] & bit and i not in pos]
+                if elim:
+                    return Step('x_wing', [], elim, pos, [d])
+    return None
+
+
+# Techniques essayées dans l'ordre, de la plus simple à la plus difficile
+TECHNIQUES = [
+    find_naked_single,
+    find_hidden_single,
+    find_pointing,
+    find_claiming,
+    find_naked_pair,
+    find_hidden_pair,
+    find_naked_triple,
+    find_x_wing
+]
+
+
+def next_step(state: CandidateState) -> Optional[Step]:
+    """Retourne la déduction logique la plus simple disponible (None si bloqué)"""
+    for technique in TECHNIQUES:
+        step = technique(state)
+        if step is not None:
+            return step
+    return None
+
+
+def level_for_score(score: int) -> str:
+    for level, max_score in LEVEL_THRESHOLDS:
+        if score <= max_score:
+            return level
+    return 'expert'
+
+
+def grade_puzzle(grid: List[List[int]]) -> dict:
+    """Résout la grille par techniques humaines et note la plus difficile utilisée
+
+    Une seule passe : on applique toujours la technique la plus simple disponible,
+    si aucune ne progresse la grille exige du backtracking.
+    """
+    state = CandidateState.from_grid(grid)
+    if state is None:
+        return {'level': 'expert', 'score': TECHNIQUE_WEIGHTS['backtracking'],
+                'hardest': 'backtracking', 'techniques': {}, 'steps': 0, 'solved_logically': False}
+
+    counts: Dict[str, int] = {}
+    hardest = None
+    steps = 0
+
+    while not state.is_solved():
+        step = next_step(state)
+        if step is None:
+            hardest = 'backtracking'
+            break
+        state.apply(step)
+        steps += 1
+        counts[step.technique] = counts.get(step.technique, 0) + 1
+        if hardest is None or TECHNIQUE_WEIGHTS[step.technique] > TECHNIQUE_WEIGHTS[hardest]:
+            hardest = step.technique
+
+    score = TECHNIQUE_WEIGHTS[hardest] if hardest else 0
+    return {
+        'level': level_for_score(score),
+        'score': score,
+        'hardest': hardest,
+        'techniques': counts,
+        'steps': steps,
+        'solved_logically': hardest != 'backtracking'
+    }
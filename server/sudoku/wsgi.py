@@ -0,0 +1,14 @@
+"""
+Point d'entrée WSGI de l'API Sudoku (production, plusieurs workers)
+Usage (depuis server/sudoku) : gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+# Chaque worker est un processus distinct : les parties doivent vivre dans
+# un store partagé pour que n'importe quel worker serve n'importe quel gameId
+os.environ.setdefault('SUDOKU_STORE', 'sqlite')
+
+from sudoku_api import app  # noqa: E402,F401
+
+__all__ = ['app']
@@ -5,9 +5,15 @@ import { Link } from 'react-router-dom';
 import axios from 'axios';
 
 interface SolveResult {
+  id: string;
   message: string;
   stdout: string;
   stderr: string;
+  grid: number[][] | null;
+  solution: number[][] | null;
+  cached: boolean;
+  output_image: string | null;
+  debug_images: string[];
 }
 
 const DEBUG_IMAGES = [
@@ -130,7 +136,9 @@ const SudokuOCR = () => {
     formData.append('file', file);
 
     try {
+      // The page shows the output and debug images: ask for their URLs (default is grid only)
       const response = await axios.post('/ocr-sudoku/solve', formData, {
+        params: { images: 'urls' },
         headers: {
           'Content-Type': 'multipart/form-data',
         },
@@ -143,22 +151,11 @@ const SudokuOCR = () => {
           if (parsed) setParsedPredictions(parsed);
         }
       
-      // Fetch output image
-      const timestamp = new Date().getTime(); // Cache busting
-      setOutputImage(`/ocr-sudoku/debug-images/output_api.png?t=${timestamp}`);
-
-      // Check for debug images
-      const availableDebugImages = [];
-      for (const img of DEBUG_IMAGES) {
-        try {
-          // Just check if we can load it, or assume it exists if success
-          // We'll just construct the URL
-          availableDebugImages.push(`/ocr-sudoku/debug-images/${img.name}?t=${timestamp}`);
-        } catch (e) {
-          console.warn(`Debug image ${img.name} not found`);
-        }
+      // Images of this request (each solve gets its own result id)
+      if (response.data.output_image) {
+        setOutputImage(`/ocr-sudoku${response.data.output_image}`);
       }
-      setDebugImages(availableDebugImages);
+      setDebugImages((response.data.debug_images || []).map((url: string) => `/ocr-sudoku${url}`));
 
     } catch (err: any) {
       console.error('Error solving sudoku:', err);